@@ -903,6 +903,25 @@ If one fact clearly and directly answers the input text, **include that fact ver
         return [(t, m) for t, m in all_goals
                 if m.get("parent_goal_id") == parent_description]
 
+    def get_goal_context(self, owner: str, goal_description: str, limit: int = 10) -> Dict[str, Any]:
+        """
+        Everything the goal prompt needs about the goal landscape, in one call.
+
+        Args:
+            owner: Goal owner
+            goal_description: Description of the goal being worked on
+            limit: Maximum number of active goals to list
+
+        Returns:
+            Dictionary with "active_goals" (prompt-formatted string, see
+            get_active_goals_for_prompt) and "subgoals" ((triple, metadata)
+            tuples, see get_subgoals)
+        """
+        return {
+            "active_goals": self.get_active_goals_for_prompt(owner=owner, limit=limit),
+            "subgoals": self.get_subgoals(goal_description, owner=owner),
+        }
+
     def get_goal_progress(self, owner: Optional[str] = None) -> Dict[str, Any]:
         """
         Get statistics on goal completion and progress.
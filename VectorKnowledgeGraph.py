@@ -1,27 +1,275 @@
+import asyncio
+import hashlib
 import json
-import re
-import shutil
+import queue
+import threading
 import time
-from functools import reduce
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
 import os
-from matplotlib import pyplot as plt
 from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# OpenMP/MKL read their thread counts when torch is first imported, so pin
+# them here before sentence_transformers pulls torch in.
+if os.getenv('SBERT_THREADS'):
+    os.environ.setdefault('OMP_NUM_THREADS', os.environ['SBERT_THREADS'])
+    os.environ.setdefault('MKL_NUM_THREADS', os.environ['SBERT_THREADS'])
+
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams
-import networkx as nx
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Iterator, Optional
 import logging
 from datetime import datetime
 from utils import setup_logging # Added import
 
-# Load environment variables
-load_dotenv()
+_torch_threads_configured = False
+
+
+def _configure_torch_threads() -> None:
+    """
+    Size torch's intra-op pool for SBERT encoding (once per process).
+
+    SBERT_THREADS overrides the default, which is the number of CPUs this
+    process may run on capped at 8; encode throughput typically peaks at
+    4-8 threads and degrades beyond that from synchronization overhead.
+    """
+    global _torch_threads_configured
+    if _torch_threads_configured:
+        return
+    _torch_threads_configured = True
+
+    import torch
+
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    threads = int(os.getenv('SBERT_THREADS', min(available, 8)))
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before any inter-op parallel work has started
+        logging.debug("torch inter-op threads already initialized, leaving as is")
+    logging.debug(f"torch using {threads} intra-op threads")
+
+
+# Default embedding models already loaded in this process, keyed by
+# (model name, backend, ONNX file, EMBEDDING_DTYPE), so every graph instance
+# shares one copy
+_MODEL_CACHE: Dict[Tuple[str, str, Optional[str], str], SentenceTransformer] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _default_model_key() -> Tuple[str, str, Optional[str], str]:
+    return (
+        os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
+        os.getenv('EMBEDDING_BACKEND', 'torch'),
+        os.getenv('EMBEDDING_ONNX_FILE'),
+        os.getenv('EMBEDDING_DTYPE', 'auto'),
+    )
+
+
+def _get_default_embedding_model(key: Tuple[str, str, Optional[str], str]) -> SentenceTransformer:
+    """Return the shared default model for key, loading it on first use."""
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = _load_default_embedding_model()
+            _MODEL_CACHE[key] = model
+        return model
+
+
+# EMBEDDING_DTYPE values -> torch dtype names
+_EMBEDDING_DTYPES = {"fp32": "float32", "fp16": "float16", "bf16": "bfloat16"}
+
+
+def _load_default_embedding_model() -> SentenceTransformer:
+    """
+    Load the SentenceTransformer named by EMBEDDING_MODEL.
+
+    EMBEDDING_BACKEND selects the inference runtime: "torch" (default),
+    "onnx" or "openvino". With "onnx", EMBEDDING_ONNX_FILE can point at a
+    quantized export shipped in the model repo (e.g.
+    "onnx/model_qint8_avx512_vnni.onnx") for INT8 CPU inference.
+
+    EMBEDDING_DTYPE sets the torch backend's precision: "auto" (default,
+    FP16 on CUDA, FP32 otherwise), "fp32", "fp16" or "bf16" (for CPUs with
+    AVX-512 BF16/AMX).
+    """
+    model_name = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+    backend = os.getenv('EMBEDDING_BACKEND', 'torch')
+    if backend == 'torch':
+        _configure_torch_threads()
+    model_kwargs: Dict[str, Any] = {}
+    if backend != 'torch':
+        model_kwargs['backend'] = backend
+        onnx_file = os.getenv('EMBEDDING_ONNX_FILE')
+        if backend == 'onnx' and onnx_file:
+            model_kwargs['model_kwargs'] = {"file_name": onnx_file}
+
+    # Try to load from saved location first (for Docker offline mode)
+    saved_model_path = '/app/models/all-MiniLM-L6-v2'
+    if os.path.exists(saved_model_path):
+        logging.info(f"Loading model from saved path: {saved_model_path}")
+        # Use local_files_only to prevent any network access
+        model = SentenceTransformer(
+            saved_model_path,
+            local_files_only=True,
+            cache_folder='/app/models',
+            **model_kwargs
+        )
+    else:
+        logging.debug(f"Loading model: {model_name} (backend: {backend})")
+        model = SentenceTransformer(model_name, **model_kwargs)
+
+    if backend == 'torch':
+        dtype = os.getenv('EMBEDDING_DTYPE', 'auto').lower()
+        if dtype == 'auto':
+            dtype = 'fp16' if model.device.type == 'cuda' else 'fp32'
+        if dtype in _EMBEDDING_DTYPES:
+            if dtype != 'fp32':
+                import torch
+
+                logging.info(f"Running embedding model in {dtype.upper()} on {model.device.type}")
+                model.to(getattr(torch, _EMBEDDING_DTYPES[dtype]))
+        else:
+            logging.warning(f"Unknown EMBEDDING_DTYPE '{dtype}', keeping FP32")
+
+    # Suppress progress bars globally for this model
+    model._show_progress_bar = False
+    return model
+
+
+# (subject, relationship, object) from a stored payload in one C call
+_TRIPLE_KEYS = itemgetter("subject", "relationship", "object")
+
+
+@dataclass
+class GoalBatch:
+    """Goal query results as parallel columns (return_format="soa")."""
+    subjects: List[str]
+    relationships: List[str]
+    objects: List[str]
+    priorities: np.ndarray  # int8, 0 where a goal has no priority
+    statuses: List[Optional[str]]
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    @classmethod
+    def empty(cls) -> "GoalBatch":
+        return cls([], [], [], np.empty(0, dtype=np.int8), [])
+
+
+@lru_cache(maxsize=256)
+def _metadata_filter(criteria_items: Tuple[Tuple[str, Any], ...]) -> models.Filter:
+    """Qdrant filter requiring every metadata.<key> to equal its value."""
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key=f"metadata.{key}",
+                match=models.MatchValue(value=value)
+            )
+            for key, value in criteria_items
+        ]
+    )
+
+
+@lru_cache(maxsize=64)
+def _priority_filter(min_priority: int, max_priority: Optional[int] = None) -> models.Filter:
+    """Qdrant filter on the metadata.priority range (max_priority None = open-ended)."""
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="metadata.priority",
+                range=models.Range(gte=min_priority, lte=max_priority)
+            )
+        ]
+    )
+
+
+# Goals still being worked on (ongoing covers forever goals)
+_ACTIVE_GOALS_FILTER = models.Filter(
+    should=[
+        models.FieldCondition(key="metadata.goal_status", match=models.MatchValue(value=status))
+        for status in ("pending", "in_progress", "ongoing")
+    ]
+)
+
+
+@lru_cache(maxsize=8)
+def _high_priority_filter(min_priority: int) -> models.Filter:
+    """Active goals with metadata.priority >= min_priority."""
+    return models.Filter(must=[*_priority_filter(min_priority).must, _ACTIVE_GOALS_FILTER])
+
+
+class _EncodeBatcher:
+    """
+    Coalesces concurrent encode requests into one model call.
+
+    Callers block in encode(); a daemon worker takes the first pending
+    request, collects whatever else arrives within max_wait seconds (up to
+    max_batch texts), encodes them together and hands each caller its rows.
+    Useful when several threads (web sessions, adapters) query at once.
+    """
+
+    def __init__(self, model, max_wait: float, max_batch: int = 64):
+        self._model = model
+        self._max_wait = max_wait
+        self._max_batch = max_batch
+        self._requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        future: Future = Future()
+        self._requests.put((texts, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self._max_wait
+            while size < self._max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                encoded = np.asarray(self._model.encode(texts, batch_size=128), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            if len(batch) > 1:
+                logging.debug(f"Encoded {len(texts)} texts for {len(batch)} callers in one batch")
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(encoded[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
 
 class VectorKnowledgeGraph:
-    def __init__(self, embedding_model=None, embedding_dim=None, path="VectorKnowledgeGraphData"):
+    def __init__(self, embedding_model=None, embedding_dim=None, path="VectorKnowledgeGraphData", in_memory=False):
         """
         Initialize the Vector Knowledge Graph.
         
@@ -29,26 +277,67 @@ class VectorKnowledgeGraph:
             embedding_model: Optional pre-configured embedding model
             embedding_dim: Optional embedding dimension (integer)
             path: Path to store graph data
+            in_memory: Keep the graph in an in-process Qdrant instance instead of
+                       on disk (nothing is persisted; intended for tests)
         """
         logging.debug(f"Initializing VectorKnowledgeGraph with path: {path}")
+        # LRU cache of sentence embeddings so repeated nodes/verbs skip the model.
+        # Vectors are held as float16 (half the memory per entry); the rounding
+        # is well below what INT8 scalar quantization already discards.
+        self._emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        try:
+            self._emb_cache_maxsize = int(os.getenv('EMBEDDING_CACHE_SIZE', 8192))
+        except ValueError:
+            logging.warning("Invalid EMBEDDING_CACHE_SIZE from env, using default 8192")
+            self._emb_cache_maxsize = 8192
+        self._emb_cache_lock = threading.RLock()
+
+        # Optional cross-thread micro-batching of encode calls; off unless
+        # EMBEDDING_BATCH_WAIT_MS is set (it adds up to that much latency)
+        try:
+            self._encode_batch_wait = float(os.getenv('EMBEDDING_BATCH_WAIT_MS', 0)) / 1000.0
+        except ValueError:
+            logging.warning("Invalid EMBEDDING_BATCH_WAIT_MS from env, encode batching disabled")
+            self._encode_batch_wait = 0.0
+        self._encode_batcher: Optional[_EncodeBatcher] = None
+
+        # TTL cache of Qdrant search results; the epoch is bumped on every write
+        self._search_cache: "OrderedDict[tuple, Tuple[float, list]]" = OrderedDict()
+        self._search_cache_maxsize = 1024
+        self._search_cache_ttl = 300.0
+        self._search_cache_lock = threading.RLock()
+        self._cache_epoch = 0
+        self._search_cache_hits = 0
+        self._search_cache_misses = 0
+        # In-memory subject vectors of small embedded collections, used for
+        # traversal instead of per-level searches (see _subject_matrix_snapshot)
+        self._subject_matrix = None
+        self._subject_matrix_max_points = 20000
+        # (timestamp, points_count) behind _collection_is_empty
+        self._point_count_cache: Optional[Tuple[float, Optional[int]]] = None
+        self._point_count_ttl = 5.0
+
+        # Number of points embedded and upserted per add_triples chunk
+        self._upsert_chunk_size = 256
+        # Concurrent chunk upserts against a Qdrant server
+        self._upsert_max_in_flight = 2
+
+        # Subject text -> ID of a point with that subject, so traversal can
+        # fetch the stored subject vector instead of re-encoding the text
+        self._subject_to_id: Dict[str, str] = {}
+        # Set when there is no saved index to load; the index is then
+        # rebuilt from the stored payloads on first traversal
+        self._subject_index_pending = False
+        # Goal description -> (point ID, match score) of exact goal matches in
+        # update_goal_metadata, so repeated status updates skip the embed + search
+        self._goal_id_cache: Dict[str, Tuple[Any, float]] = {}
+
         if embedding_model is None:
-            logging.debug("Using default embedding model")
-            model_name = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
-            # Try to load from saved location first (for Docker offline mode)
-            saved_model_path = '/app/models/all-MiniLM-L6-v2'
-            if os.path.exists(saved_model_path):
-                logging.info(f"Loading model from saved path: {saved_model_path}")
-                # Use local_files_only to prevent any network access
-                self.embedding_model = SentenceTransformer(
-                    saved_model_path,
-                    local_files_only=True,
-                    cache_folder='/app/models'
-                )
-            else:
-                logging.debug(f"Loading model: {model_name}")
-                self.embedding_model = SentenceTransformer(model_name)
-            # Suppress progress bars globally for this model
-            self.embedding_model._show_progress_bar = False
+            logging.debug("Using default embedding model (loaded on first use)")
+            # Resolved lazily through the embedding_model property
+            self._default_model_key = _default_model_key()
+            self._embedding_model = None
+            self._emb_lowercase: Optional[bool] = None
             # Ensure embedding_dim has a default integer value
             try:
                 self.embedding_dim: int = int(os.getenv('EMBEDDING_DIM', 384))
@@ -69,14 +358,41 @@ class VectorKnowledgeGraph:
             else:
                 self.embedding_dim = embedding_dim
 
-        # Ensure the directory exists
         self.save_path = path
-        os.makedirs(path, exist_ok=True)
-        logging.debug(f"Created/verified directory: {path}")
-        
-        # Initialize Qdrant client with local storage
-        logging.debug("Initializing Qdrant client")
-        self.qdrant_client = QdrantClient(path=os.path.join(path, "qdrant_data"))
+        qdrant_url = os.getenv('QDRANT_URL')
+        if in_memory:
+            logging.debug("Initializing in-memory Qdrant client")
+            self.qdrant_client = QdrantClient(location=":memory:")
+        elif qdrant_url:
+            # A Qdrant server; vectors go over gRPC (binary floats) unless
+            # QDRANT_PREFER_GRPC=false. The save path still holds the subject index.
+            os.makedirs(path, exist_ok=True)
+            local_store = os.path.join(path, "qdrant_data")
+            if os.path.isdir(os.path.join(local_store, "collection")):
+                logging.warning(
+                    f"QDRANT_URL is set but an embedded Qdrant store exists at {local_store}; "
+                    f"it is not read or migrated, unset QDRANT_URL to keep using it"
+                )
+            prefer_grpc = os.getenv('QDRANT_PREFER_GRPC', 'true').lower() in ('1', 'true', 'yes')
+            logging.info(f"Connecting to Qdrant server at {qdrant_url} (gRPC: {prefer_grpc})")
+            self.qdrant_client = QdrantClient(
+                url=qdrant_url,
+                api_key=os.getenv('QDRANT_API_KEY') or None,
+                prefer_grpc=prefer_grpc,
+                grpc_port=int(os.getenv('QDRANT_GRPC_PORT', 6334))
+            )
+        else:
+            # Ensure the directory exists
+            os.makedirs(path, exist_ok=True)
+            logging.debug(f"Created/verified directory: {path}")
+
+            # Initialize Qdrant client with local storage
+            logging.debug("Initializing Qdrant client")
+            self.qdrant_client = QdrantClient(path=os.path.join(path, "qdrant_data"))
+        # Local mode evaluates payload filters with a linear scan (payload
+        # indexes have no effect there), so filter-based lookups are only
+        # used as shortcuts against a Qdrant server.
+        self._local_storage = in_memory or not qdrant_url
         
         # Define collection with named vectors
         self.collection_name = os.getenv('QDRANT_COLLECTION_NAME', 'knowledge_graph')
@@ -88,19 +404,694 @@ class VectorKnowledgeGraph:
         
         if self.collection_name not in collection_names:
             logging.info(f"Creating new collection: {self.collection_name}")
+            # Embeddings are unit-length (see _encode), so dot product gives the
+            # same scores as cosine without the per-comparison normalization.
+            # Existing COSINE collections keep working unchanged.
+            # Full-precision vectors and payloads live on disk; HNSW scoring
+            # runs on quantized copies kept in RAM, and the top candidates are
+            # rescored against the originals (see _search_params).
             self.qdrant_client.create_collection(
                 collection_name=self.collection_name,
                 vectors_config={
-                    "subject": VectorParams(size=self.embedding_dim, distance=Distance.COSINE),
-                    "relationship": VectorParams(size=self.embedding_dim, distance=Distance.COSINE),
-                    "object": VectorParams(size=self.embedding_dim, distance=Distance.COSINE),
-                    "topic_vector": VectorParams(size=self.embedding_dim, distance=Distance.COSINE),
-                    "triple_content": VectorParams(size=self.embedding_dim, distance=Distance.COSINE)
-                }
+                    name: VectorParams(
+                        size=self.embedding_dim,
+                        distance=Distance.DOT,
+                        on_disk=True,
+                        hnsw_config=self._NO_HNSW if name in self._FILTERED_ONLY_VECTORS else None
+                    )
+                    for name in ("subject", "relationship", "object", "topic_vector", "triple_content")
+                },
+                on_disk_payload=True,
+                # Full-precision vectors live on disk and are only read for
+                # rescoring; the quantized copies and the HNSW graphs stay in RAM
+                hnsw_config=models.HnswConfigDiff(on_disk=False),
+                quantization_config=self._quantization_config()
             )
             logging.info("Collection created successfully")
         else:
             logging.debug("Collection already exists")
+            vectors = self.qdrant_client.get_collection(self.collection_name).config.params.vectors
+            subject_params = vectors.get("subject") if isinstance(vectors, dict) else None
+            if subject_params is not None and subject_params.distance == Distance.COSINE:
+                # COSINE collections hold the same unit-length vectors, so their
+                # scores match DOT exactly; recreating them would only cost a
+                # full re-embed
+                logging.info(f"Collection '{self.collection_name}' uses COSINE distance; "
+                             f"scores are equivalent to DOT for normalized embeddings, keeping it")
+
+        self._ensure_payload_indexes()
+        self._configure_search_params()
+        if not in_memory:
+            self.load(path)
+
+    # Named vectors that are only ever searched under a selective payload
+    # filter ("object" is only used to find has_goal triples). Qdrant scores
+    # the few filtered candidates exactly, so building an HNSW graph for them
+    # would only cost index time and RAM.
+    _FILTERED_ONLY_VECTORS = ("object",)
+    _NO_HNSW = models.HnswConfigDiff(m=0)
+
+    @staticmethod
+    def _quantization_config() -> Optional[Any]:
+        """
+        Quantization for new collections, chosen by QDRANT_QUANTIZATION:
+        "scalar" (default; INT8, ~4x smaller), "binary" (1 bit per dimension,
+        ~32x smaller, relies on rescoring for recall) or "none".
+        """
+        mode = os.getenv('QDRANT_QUANTIZATION', 'scalar').lower()
+        if mode == 'none':
+            return None
+        if mode == 'binary':
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        if mode != 'scalar':
+            logging.warning(f"Unknown QDRANT_QUANTIZATION '{mode}', using scalar")
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+
+    # Search quantized vectors with 2x oversampling, then rescore the
+    # candidates with the full-precision vectors to preserve recall. Ignored
+    # for collections created without quantization.
+    _search_params = models.SearchParams(
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+    )
+    # One bit per dimension keeps far less of the ranking, so binary
+    # collections fetch more candidates for the full-precision rescore
+    _BINARY_SEARCH_PARAMS = models.SearchParams(
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=3.0)
+    )
+
+    def _configure_search_params(self):
+        """Pick search params matching the collection's quantization."""
+        quantization = self.qdrant_client.get_collection(self.collection_name).config.quantization_config
+        if isinstance(quantization, models.BinaryQuantization):
+            logging.debug("Binary-quantized collection, oversampling 3x for rescoring")
+            self._search_params = self._BINARY_SEARCH_PARAMS
+
+    # Payload fields indexed for filtering (the metadata fields are the ones
+    # the query_* and goal methods filter on)
+    _PAYLOAD_INDEXES = {
+        "subject": models.PayloadSchemaType.KEYWORD,
+        "relationship": models.PayloadSchemaType.KEYWORD,
+        "object": models.PayloadSchemaType.KEYWORD,
+        "metadata.source": models.PayloadSchemaType.KEYWORD,
+        "metadata.confidence": models.PayloadSchemaType.FLOAT,
+        "metadata.speaker": models.PayloadSchemaType.KEYWORD,
+        "metadata.entity": models.PayloadSchemaType.KEYWORD,
+        "metadata.is_from_summary": models.PayloadSchemaType.BOOL,
+        "metadata.topics": models.PayloadSchemaType.KEYWORD,
+        # Principal: time-range scans (recent/episodic recall) are the most
+        # common filter, so Qdrant lays storage out around this field
+        "metadata.timestamp": models.FloatIndexParams(type=models.FloatIndexType.FLOAT, is_principal=True),
+        "metadata.episode_id": models.PayloadSchemaType.KEYWORD,
+        "metadata.goal_status": models.PayloadSchemaType.KEYWORD,
+        # Priority is only ever filtered by range, so skip the exact-match lookup map
+        "metadata.priority": models.IntegerIndexParams(type=models.IntegerIndexType.INTEGER, lookup=False, range=True),
+        "metadata.is_forever_goal": models.PayloadSchemaType.BOOL,
+    }
+
+    def _ensure_payload_indexes(self):
+        """
+        Create any missing payload indexes on the collection.
+
+        Extra keyword-indexed metadata keys can be listed (comma separated)
+        in QDRANT_METADATA_INDEXES.
+        """
+        if self._local_storage:
+            return
+        indexes = dict(self._PAYLOAD_INDEXES)
+        for key in os.getenv('QDRANT_METADATA_INDEXES', '').split(','):
+            key = key.strip()
+            if key:
+                indexes.setdefault(f"metadata.{key}", models.PayloadSchemaType.KEYWORD)
+
+        existing = self.qdrant_client.get_collection(self.collection_name).payload_schema or {}
+        for field_name, field_schema in indexes.items():
+            if field_name not in existing:
+                self._create_payload_index(field_name, field_schema)
+
+    def _create_payload_index(self, field_name: str, field_schema: Any):
+        logging.info(f"Creating payload index on '{field_name}'")
+        self.qdrant_client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name=field_name,
+            field_schema=field_schema
+        )
+
+    def index_metadata_field(self, key: str, schema: models.PayloadSchemaType = models.PayloadSchemaType.KEYWORD) -> bool:
+        """
+        Index a metadata field so filters on it (e.g. in query_triples_from_metadata)
+        use an inverted index instead of scanning every point.
+
+        Args:
+            key: Metadata key, without the "metadata." prefix
+            schema: Payload schema type of the field
+
+        Returns:
+            True if an index was created, False if it already existed or the
+            graph uses local storage (where Qdrant ignores payload indexes)
+        """
+        if self._local_storage:
+            logging.debug(f"Not indexing metadata.{key}: payload indexes have no effect on local storage")
+            return False
+        field_name = f"metadata.{key}"
+        existing = self.qdrant_client.get_collection(self.collection_name).payload_schema or {}
+        if field_name in existing:
+            return False
+        self._create_payload_index(field_name, schema)
+        return True
+
+    @staticmethod
+    def _triple_id(subject: str, relationship: str, obj: str) -> str:
+        """Deterministic point ID for a triple, so re-adding it overwrites the same point."""
+        return hashlib.md5(f"{subject}-{relationship}-{obj}".encode()).hexdigest()
+
+    @property
+    def embedding_model(self):
+        """The sentence embedding model; the shared default is loaded on first access."""
+        if self._embedding_model is None:
+            self.embedding_model = _get_default_embedding_model(self._default_model_key)
+        return self._embedding_model
+
+    @embedding_model.setter
+    def embedding_model(self, model):
+        self._embedding_model = model
+        # Uncased tokenizers lowercase their input, so the embedding cache can
+        # fold case without changing results
+        tokenizer = getattr(model, 'tokenizer', None)
+        self._emb_lowercase = bool(getattr(tokenizer, 'do_lower_case', False))
+
+    def _emb_cache_key(self, text: str) -> str:
+        """
+        Normalize text into its embedding-cache key. Surrounding whitespace
+        never changes the embedding; case is folded only when the model's
+        tokenizer lowercases its input anyway (e.g. uncased MiniLM), so
+        "Cat" and "cat " share one entry without changing any vector.
+        """
+        text = text.strip()
+        if self._emb_lowercase is None:
+            self.embedding_model  # loading the model resolves the tokenizer's casing
+        return text.lower() if self._emb_lowercase else text
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts through the LRU embedding cache.
+
+        Cached strings are served directly; only the misses are sent to the
+        embedding model, in a single batched call. Embeddings are L2-normalized,
+        so dot product equals cosine similarity. Texts are cached (and encoded)
+        in the normalized form from _emb_cache_key. Vectors are rounded to
+        float16 for the cache, so a text embeds identically on hit and miss.
+
+        Args:
+            texts: List of strings to embed
+
+        Returns:
+            Array of shape (len(texts), embedding_dim), rows in input order
+        """
+        if not texts:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        misses: Dict[str, List[int]] = {}
+        with self._emb_cache_lock:
+            for i, text in enumerate(texts):
+                key = self._emb_cache_key(text)
+                cached = self._emb_cache.get(key)
+                if cached is not None:
+                    self._emb_cache.move_to_end(key)
+                    embeddings[i] = cached
+                else:
+                    misses.setdefault(key, []).append(i)
+
+        if misses:
+            # Length-sorted so each model batch pads to similar lengths
+            # (SentenceTransformer does this itself; other encoders may not)
+            miss_texts = sorted(misses, key=len)
+            logging.debug(f"Embedding cache miss for {len(miss_texts)} of {len(texts)} texts")
+            encoded = self._encode_with_model(miss_texts)
+            norms = np.linalg.norm(encoded, axis=1, keepdims=True)
+            encoded = (encoded / np.maximum(norms, 1e-12)).astype(np.float16)
+            with self._emb_cache_lock:
+                for text, emb in zip(miss_texts, encoded):
+                    self._emb_cache[text] = emb
+                    for i in misses[text]:
+                        embeddings[i] = emb
+                while len(self._emb_cache) > self._emb_cache_maxsize:
+                    self._emb_cache.popitem(last=False)
+
+        return np.vstack(embeddings).astype(np.float32)
+
+    def _encode_with_model(self, texts: List[str]) -> np.ndarray:
+        """
+        Run the embedding model on texts, coalescing with other threads'
+        requests when EMBEDDING_BATCH_WAIT_MS enables the batcher.
+        """
+        if self._encode_batcher is None and self._encode_batch_wait > 0:
+            with self._emb_cache_lock:
+                if self._encode_batcher is None:
+                    self._encode_batcher = _EncodeBatcher(self.embedding_model, self._encode_batch_wait)
+        if self._encode_batcher is not None:
+            return self._encode_batcher.encode(texts)
+        return np.asarray(self.embedding_model.encode(texts, batch_size=128), dtype=np.float32)
+
+    def _stored_subject_vectors(self, subjects: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up already-stored "subject" vectors for exact subject strings.
+
+        Subjects in the in-process subject -> point ID index are fetched by ID.
+        The rest use the keyword index on the subject payload, which is skipped
+        for local storage where the filter would scan every point.
+
+        Returns:
+            Mapping of subject text to its stored vector, for the subjects found
+        """
+        found: Dict[str, List[float]] = {}
+        known = {self._subject_to_id[s]: s for s in subjects if s in self._subject_to_id}
+        if known:
+            records = self.qdrant_client.retrieve(
+                collection_name=self.collection_name,
+                ids=list(known),
+                with_payload=False,
+                with_vectors=["subject"]
+            )
+            ids_by_hex = {uuid.UUID(str(point_id)).hex: s for point_id, s in known.items()}
+            for record in records:
+                subject = ids_by_hex.get(uuid.UUID(str(record.id)).hex)
+                if subject is not None:
+                    found[subject] = record.vector["subject"]
+
+        if self._local_storage:
+            return found
+
+        wanted = {s for s in subjects if s not in found}
+        offset = None
+        while wanted:
+            records, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=models.Filter(must=[
+                    models.FieldCondition(key="subject", match=models.MatchAny(any=list(wanted)))
+                ]),
+                limit=256,
+                offset=offset,
+                with_payload=["subject"],
+                with_vectors=["subject"]
+            )
+            for record in records:
+                subject = record.payload.get("subject")
+                if subject in wanted:
+                    found[subject] = record.vector["subject"]
+                    wanted.discard(subject)
+            if offset is None:
+                break
+        return found
+
+    def _node_embeddings(self, nodes: List[str]) -> np.ndarray:
+        """
+        Query embeddings for traversal nodes. Nodes missing from the embedding
+        cache reuse the stored subject vector of a triple with that exact
+        subject when there is one; only never-seen nodes go through the model.
+        """
+        with self._emb_cache_lock:
+            uncached = [node for node in nodes if self._emb_cache_key(node) not in self._emb_cache]
+        stored = self._stored_subject_vectors(uncached)
+        if not stored:
+            return self._encode(nodes)
+
+        logging.debug(f"Reusing stored subject vectors for {len(stored)} of {len(nodes)} nodes")
+        to_encode = [node for node in nodes if node not in stored]
+        encoded = dict(zip(to_encode, self._encode(to_encode)))
+        return np.vstack([
+            np.asarray(stored[node], dtype=np.float32) if node in stored else encoded[node]
+            for node in nodes
+        ])
+
+    @staticmethod
+    def _triple_payload_selector(return_metadata: bool) -> models.PayloadSelectorInclude:
+        """Payload fields to fetch for triple results; metadata only when it is returned."""
+        fields = ["subject", "relationship", "object"]
+        if return_metadata:
+            fields.append("metadata")
+        return models.PayloadSelectorInclude(include=fields)
+
+    def _cached_search(self, vector_name: str, embedding: np.ndarray, limit: int,
+                       with_payload: Any = True,
+                       score_threshold: Optional[float] = None) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        """
+        Search one named vector, serving repeated queries from the TTL result cache.
+
+        Args:
+            vector_name: Named vector to search against (e.g. "subject")
+            embedding: Query embedding
+            limit: Maximum number of hits
+            with_payload: Payload to fetch (True, or a payload selector)
+            score_threshold: Minimum score; lower hits are pruned by Qdrant
+
+        Returns:
+            List of (point_id, score, payload) tuples. Payloads are shared with
+            the cache, so callers must copy before mutating them.
+        """
+        return self._cached_search_batch(vector_name, embedding[np.newaxis, :], limit, with_payload, score_threshold)[0]
+
+    def _search_cache_get(self, keys: List[tuple], now: float) -> Tuple[List[Optional[list]], List[int]]:
+        """Look keys up in the search cache; returns (results, indices of misses)."""
+        results: List[Optional[list]] = [None] * len(keys)
+        misses = []
+        with self._search_cache_lock:
+            for i, key in enumerate(keys):
+                entry = self._search_cache.get(key)
+                if entry is not None and now - entry[0] < self._search_cache_ttl:
+                    self._search_cache.move_to_end(key)
+                    self._search_cache_hits += 1
+                    results[i] = entry[1]
+                else:
+                    self._search_cache_misses += 1
+                    misses.append(i)
+        return results, misses
+
+    def _search_cache_put(self, entries: List[Tuple[tuple, list]], now: float):
+        """Store (key, hits) pairs in the search cache, evicting the oldest entries."""
+        with self._search_cache_lock:
+            for key, hits in entries:
+                self._search_cache[key] = (now, hits)
+                self._search_cache.move_to_end(key)
+            while len(self._search_cache) > self._search_cache_maxsize:
+                self._search_cache.popitem(last=False)
+
+    def _cached_search_batch(self, vector_name: str, embeddings: np.ndarray, limit: int,
+                             with_payload: Any = True,
+                             score_threshold: Optional[float] = None) -> List[List[Tuple[Any, float, Dict[str, Any]]]]:
+        """
+        Batched form of _cached_search: cache hits are answered locally and all
+        misses go to Qdrant in a single query_batch_points round trip.
+
+        Returns:
+            One hit list per embedding row, in input order
+        """
+        epoch = self._cache_epoch
+        payload_key = repr(with_payload)
+        keys = [(vector_name, np.round(emb * 1e4).astype(np.int16).tobytes(), limit, payload_key, score_threshold, epoch)
+                for emb in embeddings]
+        now = time.monotonic()
+        results, misses = self._search_cache_get(keys, now)
+
+        if misses:
+            batch_results = self.qdrant_client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(
+                        query=embeddings[i].tolist(),
+                        using=vector_name,
+                        limit=limit,
+                        with_payload=with_payload,
+                        with_vector=False,
+                        score_threshold=score_threshold,
+                        params=self._search_params
+                    )
+                    for i in misses
+                ]
+            )
+            entries = []
+            for i, response in zip(misses, batch_results):
+                results[i] = [(hit.id, hit.score, hit.payload) for hit in response.points]
+                entries.append((keys[i], results[i]))
+            self._search_cache_put(entries, now)
+
+        return results
+
+    def _cached_recommend_batch(self, vector_name: str, point_ids: List[str], limit: int,
+                                with_payload: Any = True,
+                                score_threshold: Optional[float] = None) -> List[Optional[List[Tuple[Any, float, Dict[str, Any]]]]]:
+        """
+        Like _cached_search_batch, but queries with the stored vectors of
+        existing points (a recommend query) so nothing has to be encoded or sent.
+
+        Recommend never returns the positive point itself, so each point is
+        prepended to its own results with a score of 1.0 (stored vectors are
+        unit-length, so a point's similarity to itself is 1).
+
+        Returns:
+            One hit list per point ID, in input order; None for IDs that no
+            longer exist in the collection
+        """
+        epoch = self._cache_epoch
+        payload_key = repr(with_payload)
+        keys = [("recommend", vector_name, point_id, limit, payload_key, score_threshold, epoch)
+                for point_id in point_ids]
+        now = time.monotonic()
+        results, misses = self._search_cache_get(keys, now)
+
+        if misses:
+            seeds = self.qdrant_client.retrieve(
+                collection_name=self.collection_name,
+                ids=[point_ids[i] for i in misses],
+                with_payload=with_payload,
+                with_vectors=False
+            )
+            seeds_by_hex = {uuid.UUID(str(seed.id)).hex: seed for seed in seeds}
+            misses = [i for i in misses if uuid.UUID(str(point_ids[i])).hex in seeds_by_hex]
+
+            if misses:
+                batch_results = self.qdrant_client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=[
+                        models.QueryRequest(
+                            query=models.RecommendQuery(recommend=models.RecommendInput(positive=[point_ids[i]])),
+                            using=vector_name,
+                            limit=max(limit - 1, 1),
+                            with_payload=with_payload,
+                            with_vector=False,
+                            score_threshold=score_threshold,
+                            params=self._search_params
+                        )
+                        for i in misses
+                    ]
+                )
+                entries = []
+                for i, response in zip(misses, batch_results):
+                    seed = seeds_by_hex[uuid.UUID(str(point_ids[i])).hex]
+                    results[i] = [(seed.id, 1.0, seed.payload)] + [
+                        (hit.id, hit.score, hit.payload) for hit in response.points
+                    ]
+                    entries.append((keys[i], results[i]))
+                self._search_cache_put(entries, now)
+
+        return results
+
+    def _search_subject_nodes(self, nodes: List[str], limit: int, with_payload: Any,
+                              score_threshold: Optional[float]) -> List[List[Tuple[Any, float, Dict[str, Any]]]]:
+        """
+        Subject-vector search for a batch of traversal nodes. Nodes with a
+        known point in the subject index are searched by point ID; the rest
+        are embedded and searched by vector.
+
+        Returns:
+            One hit list per node, in input order
+        """
+        matrix = self._subject_matrix_snapshot()
+        if matrix is not None:
+            return self._search_subject_matrix(matrix, nodes, limit, score_threshold)
+
+        if self._subject_index_pending:
+            self._rebuild_subject_index()
+        results: Dict[str, list] = {}
+        known = [node for node in nodes if node in self._subject_to_id]
+        if known:
+            recommended = self._cached_recommend_batch(
+                "subject", [self._subject_to_id[node] for node in known], limit,
+                with_payload=with_payload, score_threshold=score_threshold
+            )
+            for node, hits in zip(known, recommended):
+                if hits is None:
+                    # The indexed point is gone; forget it and search by text
+                    self._subject_to_id.pop(node, None)
+                else:
+                    results[node] = hits
+
+        unknown = [node for node in nodes if node not in results]
+        if unknown:
+            embeddings = self._node_embeddings(unknown)
+            searched = self._cached_search_batch(
+                "subject", embeddings, limit,
+                with_payload=with_payload, score_threshold=score_threshold
+            )
+            results.update(zip(unknown, searched))
+
+        return [results[node] for node in nodes]
+
+    def _subject_matrix_snapshot(self) -> Optional[Tuple[np.ndarray, List[Any], List[Dict[str, Any]], Dict[str, int], Dict[str, int]]]:
+        """
+        All subject vectors of a small embedded collection as one in-memory
+        matrix, loaded with a single scroll and then kept in step with writes
+        (see _patch_subject_matrix).
+
+        Embedded Qdrant answers every search with a brute-force scan plus
+        per-call copying, so for collections up to _subject_matrix_max_points
+        a BLAS matmul over this matrix replaces the per-level searches. A
+        Qdrant server may have other writers, so it is always queried directly.
+
+        Returns:
+            (matrix, point_ids, payloads, subject -> row, point ID hex -> row)
+            or None when the matrix path does not apply
+        """
+        if not self._local_storage or self._collection_is_empty():
+            return None
+        with self._search_cache_lock:
+            if self._subject_matrix is not None:
+                return self._subject_matrix
+            epoch = self._cache_epoch
+        count = self._point_count_cache[1] if self._point_count_cache else None
+        if count is None or count > self._subject_matrix_max_points:
+            return None
+
+        point_ids, payloads, vectors = [], [], []
+        offset = None
+        while True:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                with_payload=True,
+                with_vectors=["subject"],
+                limit=8192,
+                offset=offset
+            )
+            for point in points:
+                point_ids.append(point.id)
+                payloads.append(point.payload or {})
+                vectors.append(point.vector["subject"])
+            if offset is None:
+                break
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.embedding_dim)
+        rows: Dict[str, int] = {}
+        for row, payload in enumerate(payloads):
+            rows.setdefault(payload.get("subject"), row)
+        id_rows = {uuid.UUID(str(point_id)).hex: row for row, point_id in enumerate(point_ids)}
+        snapshot = (matrix, point_ids, payloads, rows, id_rows)
+        logging.debug(f"Loaded {len(point_ids)} subject vectors for in-memory traversal")
+
+        with self._search_cache_lock:
+            # A write during the scroll makes this snapshot stale
+            if self._cache_epoch == epoch:
+                self._subject_matrix = snapshot
+        return snapshot
+
+    def _search_subject_matrix(self, snapshot, nodes: List[str], limit: int,
+                               score_threshold: Optional[float]) -> List[List[Tuple[Any, float, Dict[str, Any]]]]:
+        """
+        _search_subject_nodes against the in-memory subject matrix. Nodes that
+        are stored subjects query with their stored vector (as recommend
+        does); the rest are embedded.
+
+        Payloads are the full stored payloads shared with the snapshot, so
+        callers must copy before mutating them.
+        """
+        matrix, point_ids, payloads, rows, _ = snapshot
+        to_encode = [node for node in nodes if node not in rows]
+        encoded = dict(zip(to_encode, self._encode(to_encode)))
+        queries = np.vstack([matrix[rows[node]] if node in rows else encoded[node] for node in nodes])
+        similarities = queries @ matrix.T
+
+        results = []
+        for scores in similarities:
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(scores))
+            if score_threshold is not None:
+                top = top[scores[top] >= score_threshold]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results.append([(point_ids[j], score, payloads[j]) for j, score in zip(top.tolist(), scores[top].tolist())])
+        return results
+
+    def _patch_subject_matrix(self, point_ids: List[Any], payloads: List[Dict[str, Any]],
+                              subject_vectors: Optional[List[List[float]]] = None):
+        """
+        Apply a write to the cached subject matrix instead of dropping it, so
+        the traversal after each add_triples does not pay for a full scroll.
+        Points already in the matrix get their new payload (their subject
+        vector is derived from the same triple, so it is unchanged); new
+        points are appended with their row of subject_vectors.
+
+        The snapshot tuple is replaced rather than mutated because running
+        traversals may still hold it. Pairs with
+        _invalidate_search_cache(keep_subject_matrix=True), whose epoch bump
+        keeps an in-progress scroll from being stored over the result. Falls
+        back to dropping the matrix when it cannot be patched.
+        """
+        with self._search_cache_lock:
+            snapshot = self._subject_matrix
+            if snapshot is None:
+                return
+            matrix, ids, old_payloads, rows, id_rows = snapshot
+            ids, old_payloads, rows, id_rows = list(ids), list(old_payloads), dict(rows), dict(id_rows)
+            appended = []
+            for i, (point_id, payload) in enumerate(zip(point_ids, payloads)):
+                key = uuid.UUID(str(point_id)).hex
+                row = id_rows.get(key)
+                if row is None:
+                    if subject_vectors is None:
+                        # A payload update for a point the matrix has never seen
+                        self._subject_matrix = None
+                        return
+                    row = id_rows[key] = len(ids)
+                    ids.append(point_id)
+                    old_payloads.append(payload)
+                    rows.setdefault(payload.get("subject"), row)
+                    appended.append(i)
+                else:
+                    old_payloads[row] = payload
+            if len(ids) > self._subject_matrix_max_points:
+                self._subject_matrix = None
+                return
+            if appended:
+                new_rows = np.asarray([subject_vectors[i] for i in appended], dtype=np.float32)
+                matrix = np.vstack([matrix, new_rows.reshape(len(appended), self.embedding_dim)])
+            self._subject_matrix = (matrix, ids, old_payloads, rows, id_rows)
+
+    def _invalidate_search_cache(self, keep_subject_matrix: bool = False):
+        """
+        Drop all cached search results after the collection changes. Writers
+        that patch the subject matrix themselves pass keep_subject_matrix.
+        """
+        with self._search_cache_lock:
+            self._cache_epoch += 1
+            self._search_cache.clear()
+            self._point_count_cache = None
+            if not keep_subject_matrix:
+                self._subject_matrix = None
+
+    def _collection_is_empty(self) -> bool:
+        """
+        Whether the collection has no points. The count is cached (and
+        dropped on every write) so the empty-collection guard at the top of
+        each query does not cost a get_collection round trip. Local storage
+        has no other writers, so there it is kept until the next write; a
+        server's count expires after _point_count_ttl seconds.
+        """
+        now = time.monotonic()
+        cached = self._point_count_cache
+        if cached is None or (not self._local_storage and now - cached[0] >= self._point_count_ttl):
+            count = self.qdrant_client.get_collection(self.collection_name).points_count
+            cached = self._point_count_cache = (now, count)
+        return cached[1] == 0
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """
+        Report embedding and search cache usage.
+
+        Returns:
+            Dictionary with cache sizes and search cache hit/miss counters
+        """
+        with self._search_cache_lock:
+            return {
+                "embedding_cache_size": len(self._emb_cache),
+                "search_cache_size": len(self._search_cache),
+                "search_cache_hits": self._search_cache_hits,
+                "search_cache_misses": self._search_cache_misses,
+            }
 
     def add_triples(self, triples: List[Tuple[str, str, str]], metadata: Optional[List[Dict[str, Any]]] = None): # metadata can be None
         """
@@ -122,166 +1113,337 @@ class VectorKnowledgeGraph:
             logging.warning("Mismatch between number of triples and metadata entries. Using empty metadata for safety.")
             metadata = [{} for _ in triples] # Fallback to empty if mismatch
 
-        # Generate embeddings for each component
-        logging.debug("Generating embeddings for triples")
-        subjects, relationships, objects = zip(*triples)
-        
-        # Convert tuples from zip to lists for SentenceTransformer
-        subject_embeddings = self.embedding_model.encode(list(subjects))
-        relationship_embeddings = self.embedding_model.encode(list(relationships))
-        object_embeddings = self.embedding_model.encode(list(objects))
-        
-        # Generate embeddings for the entire triple content
-        triple_content_strings = [f"Subject: {s}, Relationship: {r}, Object: {o}" for s, r, o in triples]
-        triple_content_embeddings = self.embedding_model.encode(triple_content_strings)
+        point_ids = [self._triple_id(s, r, o) for s, r, o in triples]
+
+        # Triples that are already stored keep their vectors; only new ones
+        # go through the embedding model
+        stored_vectors = {}
+        stored_metadata = {}
+        for record in self.qdrant_client.retrieve(
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=["metadata"],
+            with_vectors=["subject", "relationship", "object", "triple_content"]
+        ):
+            point_id = uuid.UUID(str(record.id)).hex
+            stored_vectors[point_id] = record.vector
+            stored_metadata[point_id] = (record.payload or {}).get("metadata")
+        logging.debug(f"{len(stored_vectors)} of {len(triples)} triples already stored, reusing their vectors")
+
+        # A stored triple re-added with identical metadata would be rewritten
+        # unchanged (same vectors, same topic vector, same payload); skip it
+        rows = [i for i, point_id in enumerate(point_ids)
+                if point_id not in stored_metadata or stored_metadata[point_id] != metadata[i]]
+        for point_id, (subject, _, _) in zip(point_ids, triples):
+            self._subject_to_id[subject] = point_id
+        if not rows:
+            logging.info(f"All {len(triples)} triples already stored unchanged, nothing to insert")
+            return
+        if len(rows) < len(triples):
+            logging.debug(f"Skipping {len(triples) - len(rows)} unchanged triples")
+            triples = [triples[i] for i in rows]
+            metadata = [metadata[i] for i in rows]
+            point_ids = [point_ids[i] for i in rows]
+
+        # Upserts run on background workers so each chunk is written while
+        # the next one is being embedded. Once the pipeline starts only the
+        # workers touch the Qdrant client. A Qdrant server handles two
+        # in-flight batches best; embedded storage takes one at a time.
+        # Chunks before the last are sent with wait=False, and the last one
+        # is only sent once the others are acknowledged, so waiting on it
+        # covers all of them.
+        chunk_size = self._upsert_chunk_size
+        max_in_flight = 1 if self._local_storage else self._upsert_max_in_flight
+        written = []
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            pending = deque()
+            for start in range(0, len(triples), chunk_size):
+                end = start + chunk_size
+                last = end >= len(triples)
+                points = self._build_points(triples[start:end], metadata[start:end], point_ids[start:end], stored_vectors)
+                while pending and (last or len(pending) >= max_in_flight):
+                    pending.popleft().result()
+                written.append(points)
+                logging.debug(f"Inserting {len(points.ids)} points into Qdrant")
+                pending.append(executor.submit(
+                    self.qdrant_client.upsert,
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=last
+                ))
+            while pending:
+                pending.popleft().result()
+
+        with self._search_cache_lock:
+            self._invalidate_search_cache(keep_subject_matrix=True)
+            self._patch_subject_matrix(
+                [point_id for points in written for point_id in points.ids],
+                [payload for points in written for payload in points.payloads],
+                [vector for points in written for vector in points.vectors["subject"]]
+            )
+        logging.info(f"Successfully inserted {len(triples)} points into Qdrant")
+
+    @staticmethod
+    def _topic_text(topics: List[str]) -> str:
+        """
+        Text embedded for a topic list: de-duplicated but kept in the
+        tagger's order, so it matches topic vectors already stored in
+        existing collections.
+        """
+        return " ".join(dict.fromkeys(topics))
+
+    def _build_points(self, triples: List[Tuple[str, str, str]], metadata: List[Dict[str, Any]],
+                      point_ids: List[str], stored_vectors: Dict[str, Dict[str, List[float]]]) -> models.Batch:
+        """
+        Build the Qdrant point batch for a chunk of triples. Triples found in
+        stored_vectors keep their vectors; the rest are embedded and added to it.
+        """
+        new_rows = [i for i, point_id in enumerate(point_ids) if point_id not in stored_vectors]
 
-        # Generate embeddings for topics
-        topic_embeddings = []
-        for meta in metadata:
+        # Embed every component of the new triples, their full content and the
+        # topics of all triples in one _encode call, so the model sees one
+        # large batch instead of five small ones. Topic vectors are always
+        # rebuilt because they depend on the (possibly updated) metadata.
+        logging.debug("Generating embeddings for triples")
+        new_triples = [triples[i] for i in new_rows]
+        # Triples tagged from the same passage share a topic set; each
+        # distinct set is embedded once
+        topic_rows = []
+        topic_slots = []
+        topic_strings: Dict[str, int] = {}
+        for i, meta in enumerate(metadata):
             triple_topics = meta.get("topics", [])
             if triple_topics and isinstance(triple_topics, list) and all(isinstance(t, str) for t in triple_topics):
-                concatenated_topics = " ".join(triple_topics)
-                topic_embeddings.append(self.embedding_model.encode([concatenated_topics])[0])
-            else:
-                # Use a zero vector if no topics or invalid format
-                topic_embeddings.append(np.zeros(self.embedding_dim))
-        
+                topic_rows.append(i)
+                topic_slots.append(topic_strings.setdefault(self._topic_text(triple_topics), len(topic_strings)))
+        n = len(new_triples)
+        embeddings = self._encode(
+            [s for s, _, _ in new_triples]
+            + [r for _, r, _ in new_triples]
+            + [o for _, _, o in new_triples]
+            + [f"Subject: {s}, Relationship: {r}, Object: {o}" for s, r, o in new_triples]
+            + list(topic_strings)
+        )
+        subject_embeddings, relationship_embeddings, object_embeddings, triple_content_embeddings = (
+            embeddings[k * n:(k + 1) * n] for k in range(4)
+        )
+
+        # Use a zero vector if no topics or invalid format
+        topic_embeddings = np.zeros((len(metadata), self.embedding_dim), dtype=np.float32)
+        topic_embeddings[topic_rows] = embeddings[4 * n:][topic_slots]
+
         logging.debug("Embeddings generated successfully")
-        
-        # Prepare points for Qdrant insertion
+
+        # Convert each embedding matrix to nested lists in one C-level call.
+        # The client validates vectors as lists of floats; handing it numpy
+        # rows is roughly 10x slower than a single matrix .tolist().
+        new_vectors = zip(
+            subject_embeddings.tolist(),
+            relationship_embeddings.tolist(),
+            object_embeddings.tolist(),
+            triple_content_embeddings.tolist()
+        )
+        for i, (s_emb, r_emb, o_emb, c_emb) in zip(new_rows, new_vectors):
+            stored_vectors[point_ids[i]] = {
+                "subject": s_emb,
+                "relationship": r_emb,
+                "object": o_emb,
+                "triple_content": c_emb
+            }
+
+        # Column-oriented batch: one validated list per named vector is
+        # cheaper to build than a PointStruct per triple
         logging.debug("Preparing points for Qdrant insertion")
-        points = []
-        for i, (triple, s_emb, r_emb, o_emb, t_emb, c_emb, meta) in enumerate(zip(triples, subject_embeddings, relationship_embeddings, object_embeddings, topic_embeddings, triple_content_embeddings, metadata)):
-            subject, relationship, obj = triple
-            # Ensure unique ID, for example, by using a combination of current time and index, or UUIDs
-            # For simplicity, using index i, but this assumes add_triples is called sequentially or IDs are managed externally
-            # A more robust ID would be `str(uuid.uuid4())` or a hash of the triple content.
-            # Using `self.qdrant_client.count(collection_name=self.collection_name).count + i` could also work if inserts are batched.
-            # For now, let's assume `i` is sufficient for this context, but flag for potential improvement.
-            # A simple way to get a unique ID for new points is to get the current count of points.
-            # However, this is not safe for concurrent additions.
-            # Let's use a timestamp + index for a bit more uniqueness in a single run.
-            # For production, a robust UUID or content hash is better.
-            # Qdrant recommends using your own IDs. If not provided, it generates them.
-            # Let's allow Qdrant to generate IDs by not specifying `id` or using `None`.
-            # Or, if we need to refer to them, we must generate them.
-            # The previous code used `i`. Let's stick to that for now, assuming it's within a single batch context.
-            # If `add_triples` is called multiple times, `i` will restart from 0, causing ID collisions.
-            # This needs to be addressed. A simple fix is to use a unique identifier.
-            # For now, let's use a placeholder for ID generation that needs to be robust.
-            # A common pattern is to use a hash of the content or a UUID.
-            # Let's use a simple counter based on existing points for this iteration.
-            # This is still not perfectly safe for concurrent writes.
-            # Qdrant can auto-generate IDs if you don't provide them.
-            # Let's try omitting the ID and let Qdrant handle it.
-            # Update: Qdrant requires IDs for `PointStruct`.
-            # We need a strategy for unique IDs.
-            # Simplest for now: use a large random number or hash of content.
-            # Let's use a hash of the triple itself for a deterministic ID.
-            import hashlib
-            triple_string = f"{subject}-{relationship}-{obj}"
-            point_id = hashlib.md5(triple_string.encode()).hexdigest()
-
-            points.append(models.PointStruct(
-                id=point_id, 
-                vector={
-                    "subject": s_emb.tolist(),
-                    "relationship": r_emb.tolist(),
-                    "object": o_emb.tolist(),
-                    "topic_vector": t_emb.tolist(),
-                    "triple_content": c_emb.tolist()
-                },
-                payload={
+        vectors = {
+            name: [stored_vectors[point_id][name] for point_id in point_ids]
+            for name in ("subject", "relationship", "object", "triple_content")
+        }
+        vectors["topic_vector"] = topic_embeddings.tolist()
+        return models.Batch(
+            ids=point_ids,
+            vectors=vectors,
+            payloads=[
+                {
                     "subject": subject,
                     "relationship": relationship,
                     "object": obj,
                     "metadata": meta
                 }
-            ))
+                for (subject, relationship, obj), meta in zip(triples, metadata)
+            ]
+        )
+
+    def _search_subject_relationship(self, subject_embedding: np.ndarray, verb: str, verb_embedding: np.ndarray,
+                                     similarity_threshold: float, max_results: int,
+                                     payload_selector: Any) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        """
+        Qdrant side of build_graph_from_subject_relationship.
 
-        if points:
-            # Insert into Qdrant
-            logging.debug("Inserting points into Qdrant")
-            self.qdrant_client.upsert(
+        Returns:
+            List of (point_id, score, payload) for triples whose subject matches
+            and whose relationship matches the verb. The score is the lower of
+            the subject and relationship similarities.
+        """
+        if self._local_storage:
+            # Local Qdrant evaluates payload filters by scanning every point,
+            # so intersect a subject search with a verb search instead; both
+            # go out in one round trip
+            logging.debug("Searching for subject and verb matches")
+            subject_response, verb_response = self.qdrant_client.query_batch_points(
                 collection_name=self.collection_name,
-                points=points
+                requests=[
+                    models.QueryRequest(
+                        query=subject_embedding.tolist(),
+                        using="subject",
+                        limit=max_results,
+                        with_payload=payload_selector,
+                        with_vector=False,
+                        score_threshold=similarity_threshold,
+                        params=self._search_params
+                    ),
+                    # Only the IDs are needed for the intersection
+                    models.QueryRequest(
+                        query=verb_embedding.tolist(),
+                        using="relationship",
+                        limit=max_results,
+                        with_payload=False,
+                        with_vector=False,
+                        params=self._search_params
+                    )
+                ]
             )
-            logging.info(f"Successfully inserted {len(points)} points into Qdrant")
+            verb_scores = {hit.id: hit.score for hit in verb_response.points}
+            return [(hit.id, min(hit.score, verb_scores[hit.id]), hit.payload)
+                    for hit in subject_response.points if hit.id in verb_scores]
         else:
-            logging.warning("No points to insert")
+            # Relationship strings are low-cardinality: take the ones nearest
+            # to the verb and restrict the subject search to them through the
+            # keyword index, so matches no longer depend on two top-k lists
+            # happening to overlap
+            logging.debug("Searching for verb matches")
+            verb_results = self.qdrant_client.query_points(
+                collection_name=self.collection_name,
+                search_params=self._search_params,
+                query=verb_embedding,
+                using="relationship",
+                limit=max_results,
+                with_payload=["relationship"],
+                with_vectors=False
+            ).points
+            # Best similarity of each nearby relationship string to the verb
+            verb_scores: Dict[str, float] = {}
+            for hit in verb_results:
+                relationship = (hit.payload or {}).get("relationship")
+                if relationship is not None:
+                    verb_scores[relationship] = max(hit.score, verb_scores.get(relationship, hit.score))
+            verb_scores.setdefault(verb, 1.0)
+            relationships = set(verb_scores)
+
+            logging.debug(f"Searching for subject matches over {len(relationships)} relationships")
+            subject_results = self.qdrant_client.query_points(
+                collection_name=self.collection_name,
+                search_params=self._search_params,
+                query=subject_embedding,
+                using="subject",
+                query_filter=models.Filter(must=[
+                    models.FieldCondition(key="relationship", match=models.MatchAny(any=list(relationships)))
+                ]),
+                limit=max_results,
+                with_payload=payload_selector,
+                with_vectors=False,
+                score_threshold=similarity_threshold
+            ).points
+            return [(hit.id, min(hit.score, verb_scores.get((hit.payload or {}).get("relationship"), 0.0)), hit.payload)
+                    for hit in subject_results]
 
     def build_graph_from_subject_relationship(self, subject_relationship, similarity_threshold=0.8, max_results=20, metadata_query=None,
                                       return_metadata=False):
         logging.debug(f"Building graph from subject-relationship with threshold: {similarity_threshold}")
         # Check if collection is empty
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning("Collection is empty")
             return []
 
         subject, verb = subject_relationship
         logging.debug(f"Generating embeddings for subject: {subject} and verb: {verb}")
-        subject_embedding = self.embedding_model.encode([subject])[0]
-        verb_embedding = self.embedding_model.encode([verb])[0]
-        
-        # Search for subject matches
-        logging.debug("Searching for subject matches")
-        subject_results = self.qdrant_client.search(
-            collection_name=self.collection_name,
-            query_vector=("subject", subject_embedding.tolist()),
-            limit=max_results,
-            with_payload=True,
-            with_vectors=False
-        )
-        
-        # Search for verb matches
-        logging.debug("Searching for verb matches")
-        verb_results = self.qdrant_client.search(
-            collection_name=self.collection_name,
-            query_vector=("relationship", verb_embedding.tolist()),
-            limit=max_results,
-            with_payload=True,
-            with_vectors=False
-        )
+        subject_embedding, verb_embedding = self._encode([subject, verb])
+        payload_selector = self._triple_payload_selector(return_metadata)
+
+        # Repeated lookups (e.g. the same recall on consecutive turns) are
+        # answered from the search cache until the next write
+        epoch = self._cache_epoch
+        cache_key = ("subject_relationship", verb,
+                     np.round(subject_embedding * 1e4).astype(np.int16).tobytes(),
+                     np.round(verb_embedding * 1e4).astype(np.int16).tobytes(),
+                     max_results, repr(payload_selector), similarity_threshold, epoch)
+        now = time.monotonic()
+        (cached,), _ = self._search_cache_get([cache_key], now)
+        if cached is not None:
+            subject_results = cached
+        else:
+            subject_results = self._search_subject_relationship(
+                subject_embedding, verb, verb_embedding, similarity_threshold, max_results, payload_selector
+            )
+            self._search_cache_put([(cache_key, subject_results)], now)
 
+        # Collect matching triples (subject hits below similarity_threshold
+        # were pruned by Qdrant)
         collected_triples = []
         collected_metadata = []
-
-        # Find common triples between subject and verb matches
-        subject_triple_ids = {hit.id for hit in subject_results}
-        verb_triple_ids = {hit.id for hit in verb_results}
-        common_triple_ids = subject_triple_ids.intersection(verb_triple_ids)
-        logging.debug(f"Found {len(common_triple_ids)} common triples")
-
-        # Collect matching triples
-        for hit in subject_results:
-            if hit.id in common_triple_ids:
-                payload = hit.payload
-                if payload:
-                    triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                    similarity = hit.score
-
-                    if similarity >= similarity_threshold:
-                        collected_triples.append(triple)
-                        if return_metadata:
-                            collected_metadata.append(payload.get("metadata"))
+        for _, score, payload in subject_results:
+            if payload:
+                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
+                collected_triples.append(triple)
+                if return_metadata:
+                    # The confidence is the weaker of the subject and verb matches
+                    metadata = dict(payload.get("metadata") or {})
+                    metadata['confidence'] = score
+                    collected_metadata.append(metadata)
 
         logging.info(f"Found {len(collected_triples)} matching triples")
         if return_metadata:
-            # Add confidence score to metadata
-            for i in range(len(collected_triples)):
-                # This confidence is based on the subject match score.
-                # A more nuanced approach could average subject and verb scores
-                # or use the minimum of the two. Let's use subject score for now.
-                subject_hit = next((hit for hit in subject_results if hit.id == common_triple_ids[i]), None)
-                if subject_hit:
-                    collected_metadata[i]['confidence'] = subject_hit.score
-                else:
-                    collected_metadata[i]['confidence'] = similarity_threshold # Default
             return list(zip(collected_triples, collected_metadata))
         else:
             return collected_triples
 
+    def iter_triples_from_metadata(self, metadata_criteria, page_size: int = 256):
+        """
+        Stream triples matching metadata criteria, one scroll page at a time.
+
+        Args:
+            metadata_criteria: Dictionary of metadata fields and values to match.
+                               Can include fields like 'speaker', 'entity', 'is_from_summary'
+            page_size: Number of points fetched per scroll request
+
+        Yields:
+            (triple, metadata) tuples
+        """
+        # Build filter condition on the nested metadata fields; repeated
+        # criteria reuse the already-validated Filter
+        criteria_items = tuple(sorted(metadata_criteria.items()))
+        try:
+            filter_condition = _metadata_filter(criteria_items)
+        except TypeError:  # unhashable criteria values
+            filter_condition = _metadata_filter.__wrapped__(criteria_items)
+
+        offset = None
+        while True:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_condition,
+                with_payload=self._triple_payload_selector(return_metadata=True),
+                with_vectors=False,
+                limit=page_size,
+                offset=offset
+            )
+            for point in points:
+                payload = point.payload
+                if payload:
+                    triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
+                    yield triple, payload.get("metadata", {})
+            if offset is None:
+                break
+
     def query_triples_from_metadata(self, metadata_criteria):
         """
         Query triples based on metadata criteria.
@@ -289,106 +1451,65 @@ class VectorKnowledgeGraph:
         Args:
             metadata_criteria: Dictionary of metadata fields and values to match.
                                Can include fields like 'speaker', 'entity', 'is_from_summary'
+
+        Returns:
+            List of (triple, metadata) tuples. Use iter_triples_from_metadata
+            to stream large result sets instead.
         """
         logging.info(f"Querying triples with metadata criteria: {metadata_criteria}")
-        # Build filter condition
-        filter_conditions = []
-        for key, value in metadata_criteria.items():
-            # Handle special cases for common fields
-            if key in ['speaker', 'entity', 'is_from_summary']:
-                filter_conditions.append(
-                    models.FieldCondition(
-                        key=f"metadata.{key}",
-                        match=models.MatchValue(value=value)
-                    )
-                )
-            else:
-                # For nested metadata fields
-                filter_conditions.append(
-                    models.FieldCondition(
-                        key=f"metadata.{key}",
-                        match=models.MatchValue(value=value)
-                    )
-                )
-        
-        filter_condition = models.Filter(
-            must=filter_conditions
-        )
-        
-        # Query Qdrant
-        logging.debug("Executing metadata query")
-        results = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=filter_condition,
-            with_payload=True,
-            limit=1000
-        )
-        
-        # Return triples with complete metadata
-        triples_with_metadata = []
-        for hit in results[0]: # results[0] contains the list of Hit objects
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                metadata = payload.get("metadata", {})
-                triples_with_metadata.append((triple, metadata))
-        
+        triples_with_metadata = list(self.iter_triples_from_metadata(metadata_criteria))
         logging.info(f"Found {len(triples_with_metadata)} triples matching metadata criteria")
         return triples_with_metadata
 
-    def get_all_triples(self):
+    def iter_all_triples(self, page_size: int = 8192):
         """
-        Retrieve all triples stored in the knowledge graph with their metadata.
-        
-        Returns:
-            List of dictionaries, where each dictionary contains subject, predicate, object and metadata
+        Stream every triple in the knowledge graph, one scroll page at a time.
+
+        Args:
+            page_size: Number of points fetched per scroll request
+
+        Yields:
+            Dictionaries with subject, predicate, object and (if present) metadata
         """
-        logging.info("Retrieving all triples from knowledge graph")
-        
-        # Check if collection is empty
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
-            logging.warning("Collection is empty")
-            return []
-        
-        # Use scroll to retrieve all points
-        all_points = []
         offset = None
-        
         while True:
-            # Get a batch of points
-            batch, offset = self.qdrant_client.scroll(
+            # Only the triple fields are fetched, never the vectors
+            points, offset = self.qdrant_client.scroll(
                 collection_name=self.collection_name,
-                scroll_filter=None,  # No filter to get all points
-                limit=1000,  # Get 1000 points at a time
-                offset=offset,  # Use the offset from the previous iteration
-                with_payload=True,
+                limit=page_size,
+                offset=offset,
+                with_payload=models.PayloadSelectorInclude(include=["subject", "relationship", "object", "metadata"]),
                 with_vectors=False
             )
-            
-            all_points.extend(batch)
-            
-            # If there are no more points, break the loop
-            if len(batch) < 1000 or offset is None:
+            for point in points:
+                payload = point.payload
+                if payload:
+                    triple_data = {
+                        "subject": payload.get("subject"),
+                        "predicate": payload.get("relationship"),
+                        "object": payload.get("object")
+                    }
+
+                    # Add metadata if available
+                    if "metadata" in payload:
+                        triple_data["metadata"] = payload.get("metadata")
+
+                    yield triple_data
+
+            # If there are no more points, stop
+            if offset is None:
                 break
+
+    def get_all_triples(self):
+        """
+        Retrieve all triples stored in the knowledge graph with their metadata.
         
-        # Convert points to triple format with metadata
-        triples = []
-        for point in all_points:
-            payload = point.payload
-            if payload:
-                triple_data = {
-                    "subject": payload.get("subject"),
-                    "predicate": payload.get("relationship"),
-                    "object": payload.get("object")
-                }
-                
-                # Add metadata if available
-                if "metadata" in payload:
-                    triple_data["metadata"] = payload.get("metadata")
-                
-                triples.append(triple_data)
-        
+        Returns:
+            List of dictionaries, where each dictionary contains subject, predicate, object and metadata.
+            Use iter_all_triples to stream large graphs instead.
+        """
+        logging.info("Retrieving all triples from knowledge graph")
+        triples = list(self.iter_all_triples())
         logging.info(f"Retrieved {len(triples)} triples from knowledge graph")
         return triples
 
@@ -411,28 +1532,29 @@ class VectorKnowledgeGraph:
             logging.warning("query_topics list is empty or contains non-string elements. Returning no results.")
             return []
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return []
 
         # Concatenate query topics and generate embedding
-        concatenated_query_topics = " ".join(query_topics)
+        concatenated_query_topics = self._topic_text(query_topics)
         if not concatenated_query_topics.strip():
             logging.warning("Concatenated query topics are empty. Returning no results.")
             return []
             
-        query_topic_embedding = self.embedding_model.encode([concatenated_query_topics])[0]
+        query_topic_embedding = self._encode([concatenated_query_topics])[0]
 
         logging.debug(f"Searching with topic vector against collection: {self.collection_name}")
-        search_results = self.qdrant_client.search(
+        search_results = self.qdrant_client.query_points(
             collection_name=self.collection_name,
-            query_vector=("topic_vector", query_topic_embedding.tolist()), # Search against 'topic_vector'
+            search_params=self._search_params,
+            query=query_topic_embedding,
+            using="topic_vector", # Search against 'topic_vector'
             limit=limit,
             score_threshold=similarity_threshold, # Qdrant uses score_threshold for minimum similarity
             with_payload=True,
             with_vectors=False # We don't need the vectors themselves in the result
-        )
+        ).points
 
         found_triples = []
         for hit in search_results:
@@ -467,15 +1589,17 @@ class VectorKnowledgeGraph:
         """
         logging.info(f"Finding triples by text similarity for: '{query_text}'")
         
-        query_embedding = self.embedding_model.encode([query_text])[0]
+        query_embedding = self._encode([query_text])[0]
 
-        search_results = self.qdrant_client.search(
+        search_results = self.qdrant_client.query_points(
             collection_name=self.collection_name,
-            query_vector=("triple_content", query_embedding.tolist()),
+            search_params=self._search_params,
+            query=query_embedding,
+            using="triple_content",
             limit=limit,
             score_threshold=similarity_threshold,
             with_payload=True
-        )
+        ).points
 
         found_triples = []
         for hit in search_results:
@@ -509,8 +1633,7 @@ class VectorKnowledgeGraph:
             logging.warning("topics_to_match list is empty. Returning no results.")
             return []
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return []
 
@@ -532,7 +1655,9 @@ class VectorKnowledgeGraph:
             ]
         )
 
-        logging.debug(f"Executing scroll query with topic filter: {topic_filter}")
+        # The pydantic repr of a filter is not cheap; only build it when logged
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Executing scroll query with topic filter: {topic_filter}")
         # Using scroll to get all matching results up to the limit
         results, _ = self.qdrant_client.scroll(
             collection_name=self.collection_name,
@@ -556,6 +1681,35 @@ class VectorKnowledgeGraph:
         logging.info(f"Found {len(found_triples)} triples matching topic tags: {valid_topics_to_match}")
         return found_triples
 
+    def _similar_pairs(self, embeddings: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Upper-triangle pairs (i < j) of unit-length embeddings whose dot
+        product (cosine similarity) is at least threshold.
+
+        The Gram matrix is computed on the embedding model's GPU when it runs
+        on CUDA, and only the surviving pairs are copied back; otherwise it
+        is a single BLAS matmul.
+
+        Returns:
+            (rows, cols, scores) arrays, in row-major pair order
+        """
+        n = len(embeddings)
+        device = getattr(self.embedding_model, 'device', None)
+        if getattr(device, 'type', None) == 'cuda':
+            import torch
+
+            with torch.no_grad():
+                matrix = torch.from_numpy(embeddings).to(device)
+                rows, cols = torch.triu_indices(n, n, offset=1, device=device)
+                scores = (matrix @ matrix.T)[rows, cols]
+                keep = scores >= threshold
+                return rows[keep].cpu().numpy(), cols[keep].cpu().numpy(), scores[keep].float().cpu().numpy()
+
+        rows, cols = np.triu_indices(n, k=1)
+        scores = (embeddings @ embeddings.T)[rows, cols]
+        keep = scores >= threshold
+        return rows[keep], cols[keep], scores[keep]
+
     def compute_entity_similarities(self, entities: List[str], similarity_threshold: float = 0.6) -> List[Tuple[str, str, float]]:
         """
         Compute pairwise semantic similarities between entities based on their embeddings.
@@ -577,28 +1731,84 @@ class VectorKnowledgeGraph:
             return []
 
         # Generate embeddings for all entities
-        entity_embeddings = self.embedding_model.encode(entities)
+        entity_embeddings = self._encode(entities)
 
-        # Compute pairwise cosine similarities
-        from numpy import dot
-        from numpy.linalg import norm
+        rows, cols, scores = self._similar_pairs(entity_embeddings, similarity_threshold)
 
-        def cosine_similarity(a, b):
-            return float(dot(a, b) / (norm(a) * norm(b) + 1e-12))
+        # Sort descending; only the surviving pairs become Python tuples
+        order = np.argsort(-scores, kind="stable")
+        similarities = [
+            (entities[i], entities[j], score)
+            for i, j, score in zip(rows[order].tolist(), cols[order].tolist(), scores[order].tolist())
+        ]
 
-        similarities = []
-        for i in range(len(entities)):
-            for j in range(i + 1, len(entities)):  # Only upper triangle to avoid duplicates
-                sim_score = cosine_similarity(entity_embeddings[i], entity_embeddings[j])
+        logging.info(f"Found {len(similarities)} entity pairs with similarity >= {similarity_threshold}")
+        return similarities
 
-                if sim_score >= similarity_threshold:
-                    similarities.append((entities[i], entities[j], sim_score))
+    def _iter_filtered(self, scroll_filter: models.Filter, limit: int, return_metadata: bool) -> Iterator:
+        """
+        Stream up to limit triples matching scroll_filter, one scroll page at
+        a time, fetching only the payload fields that are returned.
 
-        # Sort by similarity descending
-        similarities.sort(key=lambda x: x[2], reverse=True)
+        Yields:
+            (triple, metadata) tuples, or bare triples without return_metadata
+        """
+        triple_keys = _TRIPLE_KEYS
+        for payload in self._iter_filtered_payloads(scroll_filter, limit,
+                                                    self._triple_payload_selector(return_metadata)):
+            try:
+                triple = triple_keys(payload)
+            except KeyError:
+                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
+            yield (triple, payload.get("metadata", {})) if return_metadata else triple
 
-        logging.info(f"Found {len(similarities)} entity pairs with similarity >= {similarity_threshold}")
-        return similarities
+    def _iter_filtered_payloads(self, scroll_filter: models.Filter, limit: int,
+                                payload_selector: Any) -> Iterator[Dict[str, Any]]:
+        """Stream the non-empty payloads of up to limit points matching scroll_filter."""
+        remaining = limit
+        offset = None
+        while remaining > 0:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=min(remaining, 256),
+                offset=offset,
+                with_payload=payload_selector,
+                with_vectors=False
+            )
+            remaining -= len(points)
+            for point in points:
+                if point.payload:
+                    yield point.payload
+            if offset is None:
+                break
+
+    def _goal_batch(self, scroll_filter: models.Filter, limit: int) -> GoalBatch:
+        """
+        Columnar form of _iter_filtered for goal queries. Only the triple,
+        priority and status are fetched, and no per-goal metadata dict is built.
+        """
+        selector = models.PayloadSelectorInclude(
+            include=["subject", "relationship", "object", "metadata.priority", "metadata.goal_status"]
+        )
+        subjects, relationships, objects, priorities, statuses = [], [], [], [], []
+        for payload in self._iter_filtered_payloads(scroll_filter, limit, selector):
+            metadata = payload.get("metadata") or {}
+            subjects.append(payload.get("subject"))
+            relationships.append(payload.get("relationship"))
+            objects.append(payload.get("object"))
+            priorities.append(metadata.get("priority") or 0)
+            statuses.append(metadata.get("goal_status"))
+        return GoalBatch(subjects, relationships, objects, np.array(priorities, dtype=np.int8), statuses)
+
+    def _goal_results(self, scroll_filter: models.Filter, limit: int, return_metadata: bool,
+                      return_format: str):
+        """Run a goal query in the requested return_format ("aos" list or "soa" GoalBatch)."""
+        if return_format == "soa":
+            return self._goal_batch(scroll_filter, limit)
+        if return_format != "aos":
+            raise ValueError(f"Unknown return_format '{return_format}', expected 'aos' or 'soa'")
+        return list(self._iter_filtered(scroll_filter, limit, return_metadata))
 
     def query_by_time_range(self, start_time: float, end_time: float, limit: int = 100, return_metadata: bool = True) -> List:
         """
@@ -615,8 +1825,7 @@ class VectorKnowledgeGraph:
         """
         logging.info(f"Querying triples from time range: {datetime.fromtimestamp(start_time)} to {datetime.fromtimestamp(end_time)}")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return []
 
@@ -633,25 +1842,7 @@ class VectorKnowledgeGraph:
             ]
         )
 
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=time_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
-
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        found_triples = list(self._iter_filtered(time_filter, limit, return_metadata))
 
         logging.info(f"Found {len(found_triples)} triples in time range")
         return found_triples
@@ -683,185 +1874,293 @@ class VectorKnowledgeGraph:
             limit: Maximum number of results
             return_metadata: Whether to return metadata
 
-        Returns:
-            List of triples from the episode (with metadata if requested)
-        """
-        logging.info(f"Querying triples for episode: {episode_id}")
-
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
-            logging.warning(f"Collection '{self.collection_name}' is empty.")
-            return []
-
-        # Build filter for episode_id
-        episode_filter = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.episode_id",
-                    match=models.MatchValue(value=episode_id)
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=episode_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
+        Returns:
+            List of triples from the episode (with metadata if requested)
+        """
+        logging.info(f"Querying triples for episode: {episode_id}")
 
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        if self._collection_is_empty():
+            logging.warning(f"Collection '{self.collection_name}' is empty.")
+            return []
+
+        episode_filter = _metadata_filter((("episode_id", episode_id),))
+        found_triples = list(self._iter_filtered(episode_filter, limit, return_metadata))
 
         logging.info(f"Found {len(found_triples)} triples for episode {episode_id}")
         return found_triples
 
     def save(self, path=""):
-        """Save is now handled automatically by Qdrant's local storage"""
-        logging.debug("Save operation not needed (handled by Qdrant)")
-        pass
+        """
+        Persist the subject -> point ID index next to the Qdrant data.
+        The triples themselves are persisted automatically by Qdrant.
+        """
+        path = path or self.save_path
+        index_file = os.path.join(path, "subject_index.json")
+        with open(index_file, "w", encoding="utf-8") as f:
+            json.dump(self._subject_to_id, f)
+        logging.debug(f"Saved subject index ({len(self._subject_to_id)} subjects) to {index_file}")
 
     def load(self, path="VectorKnowledgeGraphData"):
-        """Load is now handled automatically by Qdrant's local storage"""
-        logging.debug("Load operation not needed (handled by Qdrant)")
+        """
+        Restore the subject -> point ID index written by save(), if present.
+        The triples themselves are loaded automatically by Qdrant.
+        """
+        index_file = os.path.join(path, "subject_index.json")
+        if not os.path.exists(index_file):
+            self._subject_index_pending = True
+            return False
+        try:
+            with open(index_file, encoding="utf-8") as f:
+                self._subject_to_id.update(json.load(f))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load subject index from {index_file}: {e}")
+            self._subject_index_pending = True
+            return False
+        logging.debug(f"Loaded subject index ({len(self._subject_to_id)} subjects) from {index_file}")
         return True
 
-    def build_graph_from_noun(self, query, similarity_threshold=0.8, depth=0, metadata_query=None,
-                              return_metadata=False, confidence_decay=0.8):
-        logging.debug(f"Building graph from noun: {query} with depth: {depth}")
-        # Check if collection is empty
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
-            logging.warning("Collection is empty")
-            return []
+    def _rebuild_subject_index(self):
+        """Fill the subject -> point ID index from the stored subject payloads."""
+        self._subject_index_pending = False
+        offset = None
+        while True:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                with_payload=["subject"],
+                with_vectors=False,
+                limit=8192,
+                offset=offset
+            )
+            for point in points:
+                subject = (point.payload or {}).get("subject")
+                if subject is not None:
+                    self._subject_to_id.setdefault(subject, str(point.id))
+            if offset is None:
+                break
+        logging.info(f"Rebuilt subject index ({len(self._subject_to_id)} subjects) from stored triples")
 
-        # Initialize lists to collect results and a set to keep track of visited nodes
-        collected_triples = []
-        collected_metadata = []
-        visited = set()
+    def _traverse_subjects(self, roots: List[str], similarity_threshold: float, depth: int,
+                           with_payload: Any,
+                           max_nodes: Optional[int] = None) -> Iterator[Tuple[int, str, List[Tuple[Any, float, Dict[str, Any]]]]]:
+        """
+        Breadth-first walk from the roots along subject -> object edges.
 
-        def recursive_search(current_point, current_depth, current_confidence):
-            if current_depth > depth:
-                return
+        Each depth level is searched against the "subject" vectors in one
+        batched round trip (recommend by point ID for known subjects, encode +
+        vector query for the rest). Every node is expanded at most once, even
+        when several roots or parents reach it.
 
-            visited.add(current_point)
-            logging.debug(f"Processing node: {current_point} at depth {current_depth} with confidence {current_confidence:.2f}")
-            current_point_embedding = self.embedding_model.encode([current_point])[0]
+        Args:
+            roots: Starting nodes (duplicates are ignored)
+            similarity_threshold: Minimum subject similarity for a hit
+            depth: Number of hops to follow beyond the roots
+            with_payload: Payload selector for the hits
+            max_nodes: Optional budget on the total number of nodes expanded;
+                       the walk stops descending once it is spent
+
+        Yields:
+            (depth, node, hits) per expanded node, where hits are the
+            (point_id, score, payload) tuples above the threshold
+        """
+        visited = set()
+        frontier = list(dict.fromkeys(roots))
+        for current_depth in range(depth + 1):
+            nodes = [node for node in frontier if node not in visited]
+            if max_nodes is not None:
+                # Frontier order is discovery order, so the budget keeps the
+                # nodes reached from the strongest, earliest matches
+                nodes = nodes[:max(max_nodes - len(visited), 0)]
+            if not nodes:
+                break
+            visited.update(nodes)
+            logging.debug(f"Processing {len(nodes)} nodes at depth {current_depth}")
 
-            # Only search for matches where the current point is the subject
-            subject_results = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=("subject", current_point_embedding.tolist()),
-                limit=100,
-                with_payload=True,
-                with_vectors=False
+            results_per_node = self._search_subject_nodes(
+                nodes, limit=100, with_payload=with_payload, score_threshold=similarity_threshold
             )
 
-            # Process subject matches
-            for hit in subject_results:
-                payload = hit.payload
-                if payload:
-                    triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                    similarity = hit.score
-
-                    if similarity >= similarity_threshold:
-                        # The confidence of this triple is the initial match similarity
-                        # times the decay factor for its depth
-                        new_confidence = current_confidence * similarity
-                        
-                        collected_triples.append(triple)
-                        if return_metadata:
-                            metadata = payload.get("metadata", {})
-                            metadata['confidence'] = new_confidence
-                            collected_metadata.append(metadata)
-
-                        # Recurse on the object if it hasn't been visited
-                        object_val = payload.get("object")
-                        if object_val and object_val not in visited:
-                            # The confidence for the next level is decayed
-                            recursive_search(object_val, current_depth + 1, new_confidence * confidence_decay)
-
-        # Kick off the recursive search from the query point with initial confidence of 1.0
-        recursive_search(query, 0, 1.0)
-        logging.info(f"Found {len(collected_triples)} triples in graph traversal")
+            next_frontier = {}
+            for node, hits in zip(nodes, results_per_node):
+                hits = [hit for hit in hits if hit[2]]
+                yield current_depth, node, hits
+                for _, _, payload in hits:
+                    object_val = payload.get("object")
+                    if object_val and object_val not in visited:
+                        next_frontier[object_val] = None
+            frontier = list(next_frontier)
 
-        if return_metadata:
-            return list(zip(collected_triples, collected_metadata))
-        else:
-            return collected_triples
+    def build_graph_from_noun(self, query, similarity_threshold=0.8, depth=0, metadata_query=None,
+                              return_metadata=False, confidence_decay=0.8, max_nodes=None):
+        return self.build_graph_from_nouns([query], similarity_threshold, depth, metadata_query,
+                                           return_metadata, confidence_decay, max_nodes)
 
-    def visualize_graph_from_nouns(self, queries, similarity_threshold=0.8, depth=0, metadata_query=None):
-        logging.info(f"Visualizing graph for queries: {queries}")
+    def build_graph_from_nouns(self, queries, similarity_threshold=0.8, depth=0, metadata_query=None,
+                               return_metadata=False, confidence_decay=0.8, max_nodes=None):
+        """
+        build_graph_from_noun over several starting nouns at once. All roots
+        share one traversal, so each level is a single batched round trip
+        and nodes reachable from several roots are expanded once.
+        """
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Building graph from nouns: {queries} with depth: {depth}")
         # Check if collection is empty
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning("Collection is empty")
-            return
+            return []
 
-        G = nx.DiGraph()
-        visited = set()
+        # Insertion-ordered triple -> metadata (None unless return_metadata);
+        # the dict doubles as the dedup set
+        collected: Dict[Tuple[str, str, str], Optional[Dict[str, Any]]] = {}
+
+        # Each node's confidence comes from the first path that reached it
+        node_confidence = {query: 1.0 for query in queries}
+        for _, node, subject_results in self._traverse_subjects(
+            queries, similarity_threshold, depth, self._triple_payload_selector(return_metadata),
+            max_nodes=max_nodes
+        ):
+            current_confidence = node_confidence[node]
+            for _, similarity, payload in subject_results:
+                # The confidence of this triple is the confidence of the
+                # node it was reached from times the match similarity
+                new_confidence = current_confidence * similarity
+
+                # A triple can match several frontier nodes; keep its
+                # first (highest-level) occurrence
+                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
+                if triple not in collected:
+                    metadata = None
+                    if return_metadata:
+                        # Copy so the cached payload is not mutated
+                        metadata = dict(payload.get("metadata", {}))
+                        metadata['confidence'] = new_confidence
+                    collected[triple] = metadata
 
-        def recursive_search(current_point, current_depth):
-            if current_depth > depth:
-                return
+                # The confidence for the next level is decayed
+                object_val = payload.get("object")
+                if object_val:
+                    node_confidence.setdefault(object_val, new_confidence * confidence_decay)
 
-            visited.add(current_point)
-            logging.debug(f"Processing node: {current_point} at depth {current_depth}")
-            current_point_embedding = self.embedding_model.encode([current_point])[0]
+        logging.info(f"Found {len(collected)} triples in graph traversal")
 
-            # Only search for matches where the current point is the subject
-            subject_results = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=("subject", current_point_embedding.tolist()),
-                limit=100,
-                with_payload=True,
-                with_vectors=False
-            )
+        if return_metadata:
+            return list(collected.items())
+        else:
+            return list(collected)
 
-            # Process subject matches
-            for hit in subject_results:
-                payload = hit.payload
-                if payload:
-                    similarity = hit.score
+    async def abuild_graph_from_nouns(self, queries, similarity_threshold=0.8, depth=0, metadata_query=None,
+                                      return_metadata=False, confidence_decay=0.8, max_nodes=None):
+        """
+        Awaitable build_graph_from_nouns for event-loop callers. Encoding and
+        Qdrant calls run in the default executor so they do not block the loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.build_graph_from_nouns(queries, similarity_threshold, depth, metadata_query,
+                                                return_metadata, confidence_decay, max_nodes)
+        )
+
+    # Graphs larger than this are returned without being drawn
+    _VISUALIZE_MAX_NODES = 500
+    # Node and edge labels are only drawn up to these sizes
+    _VISUALIZE_MAX_NODE_LABELS = 100
+    _VISUALIZE_MAX_EDGE_LABELS = 50
+
+    @staticmethod
+    def _graph_layout(G: "nx.DiGraph") -> Dict[Any, Tuple[float, float]]:
+        """
+        Node positions for drawing, from the first available compiled layout:
+        Graphviz's sfdp (pygraphviz), then igraph's Fruchterman-Reingold,
+        falling back to a short networkx spring layout.
+        """
+        import networkx as nx
+
+        try:
+            return nx.nx_agraph.graphviz_layout(G, prog="sfdp")
+        except Exception as e:
+            # No pygraphviz, no sfdp binary on PATH, or sfdp itself failed
+            logging.debug(f"sfdp layout unavailable, falling back: {e}")
+        try:
+            import igraph
+        except ImportError:
+            return nx.spring_layout(G, seed=42, iterations=20)
+        ig = igraph.Graph.TupleList(G.edges(), directed=True)
+        layout = ig.layout_fruchterman_reingold(niter=500)
+        return {name: tuple(coords) for name, coords in zip(ig.vs["name"], layout.coords)}
+
+    def visualize_graph_from_nouns(self, queries, similarity_threshold=0.8, depth=0, metadata_query=None, max_nodes=None):
+        """
+        Build the subject -> object graph reachable from queries and draw it.
 
-                    if similarity >= similarity_threshold:
-                        G.add_edge(payload.get("subject"), payload.get("object"),
-                                 weight=similarity,
-                                 label=f'Similarity: {similarity:.2f}')
+        Returns:
+            The networkx DiGraph (None if the collection is empty). Graphs with
+            more than _VISUALIZE_MAX_NODES nodes are returned without drawing.
+        """
+        logging.info(f"Visualizing graph for queries: {queries}")
+        # Check if collection is empty
+        if self._collection_is_empty():
+            logging.warning("Collection is empty")
+            return
 
-                        object_val = payload.get("object")
-                        if object_val and object_val not in visited:
-                            recursive_search(object_val, current_depth + 1)
+        # All roots share one traversal, so each level is a single batched
+        # encode + search and nodes reachable from several roots are only
+        # expanded once. Edges are collected first and added in bulk.
+        edges = [
+            (payload.get("subject"), payload.get("object"), similarity)
+            for _, _, subject_results in self._traverse_subjects(
+                queries, similarity_threshold, depth, models.PayloadSelectorInclude(include=["subject", "object"]),
+                max_nodes=max_nodes
+            )
+            for _, similarity, payload in subject_results
+        ]
+        # networkx and matplotlib are only needed here, so they are not
+        # loaded for the ingest/query paths
+        import networkx as nx
+        from matplotlib import pyplot as plt
 
-        for query in queries:
-            recursive_search(query, 0)
+        G = nx.DiGraph()
+        G.add_weighted_edges_from(edges)
 
         logging.info(f"Graph contains {len(G.nodes)} nodes and {len(G.edges)} edges")
+        if len(G.nodes) > self._VISUALIZE_MAX_NODES:
+            logging.warning(f"Graph has more than {self._VISUALIZE_MAX_NODES} nodes, skipping drawing")
+            return G
         logging.debug("Drawing graph visualization")
-        pos = nx.spring_layout(G, seed=42)
-        nx.draw_networkx_nodes(G, pos, node_size=500)
-        nx.draw_networkx_edges(G, pos, width=1.0, alpha=0.5)
-        edge_labels = {(node1, node2): data['label'] for node1, node2, data in G.edges(data=True)}
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='red')
-        nx.draw_networkx_labels(G, pos, font_size=12)
+        pos = self._graph_layout(G)
+        # Nodes and edges are drawn as one scatter and one LineCollection
+        # from position arrays rather than one matplotlib artist per element
+        from matplotlib.collections import LineCollection
+
+        fig, ax = plt.subplots()
+        node_xy = np.array([pos[node] for node in G.nodes()], dtype=float).reshape(-1, 2)
+        edge_xy = np.array([(pos[u], pos[v]) for u, v in G.edges()], dtype=float).reshape(-1, 2, 2)
+        ax.add_collection(LineCollection(edge_xy, linewidths=1.0, alpha=0.5, zorder=1))
+        ax.scatter(node_xy[:, 0], node_xy[:, 1], s=500, zorder=2)
+        # Labels are unreadable on dense graphs, so they are only drawn on small ones
+        if len(G.edges) <= self._VISUALIZE_MAX_EDGE_LABELS:
+            edge_labels = {(node1, node2): f"Similarity: {data['weight']:.2f}" for node1, node2, data in G.edges(data=True)}
+            nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='red', ax=ax)
+        if len(G.nodes) <= self._VISUALIZE_MAX_NODE_LABELS:
+            nx.draw_networkx_labels(G, pos, font_size=12, ax=ax)
+        ax.autoscale_view()
+        ax.set_axis_off()
         plt.show()
         logging.info("Graph visualization completed")
+        return G
 
     # ============================================================================
     # GOAL SYSTEM QUERY METHODS
     # ============================================================================
 
-    def query_goals_by_status(self, status: str, limit: int = 100, return_metadata: bool = True) -> List:
+    def iter_goals_by_status(self, status: str, limit: int = 100, return_metadata: bool = True) -> Iterator:
+        """
+        Stream goals with the given status lazily, one scroll page at a time;
+        see query_goals_by_status.
+        """
+        return self._iter_filtered(_metadata_filter((("goal_status", status),)), limit, return_metadata)
+
+    def query_goals_by_status(self, status: str, limit: int = 100, return_metadata: bool = True,
+                              return_format: str = "aos") -> Any:
         """
         Query goals by their status.
 
@@ -869,51 +2168,26 @@ class VectorKnowledgeGraph:
             status: Goal status to filter by (pending, in_progress, completed, blocked, cancelled)
             limit: Maximum number of results
             return_metadata: Whether to return metadata
+            return_format: "aos" for a list of triples, or "soa" for a GoalBatch
+                           of parallel columns (return_metadata is ignored)
 
         Returns:
-            List of goal triples matching the status
+            List of goal triples matching the status (a GoalBatch for "soa")
         """
         logging.info(f"Querying goals with status: {status}")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
-            return []
-
-        # Build filter for goal_status in metadata
-        status_filter = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.goal_status",
-                    match=models.MatchValue(value=status)
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=status_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
+            return GoalBatch.empty() if return_format == "soa" else []
 
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        found_triples = self._goal_results(_metadata_filter((("goal_status", status),)), limit,
+                                           return_metadata, return_format)
 
         logging.info(f"Found {len(found_triples)} goals with status '{status}'")
         return found_triples
 
-    def query_goals_by_priority(self, min_priority: int = 1, max_priority: int = 5, limit: int = 100, return_metadata: bool = True) -> List:
+    def query_goals_by_priority(self, min_priority: int = 1, max_priority: int = 5, limit: int = 100, return_metadata: bool = True,
+                                return_format: str = "aos") -> Any:
         """
         Query goals by priority range.
 
@@ -922,108 +2196,44 @@ class VectorKnowledgeGraph:
             max_priority: Maximum priority (1-5)
             limit: Maximum number of results
             return_metadata: Whether to return metadata
+            return_format: "aos" for a list of triples, or "soa" for a GoalBatch
+                           of parallel columns (return_metadata is ignored)
 
         Returns:
-            List of goal triples in the priority range
+            List of goal triples in the priority range (a GoalBatch for "soa")
         """
         logging.info(f"Querying goals with priority {min_priority}-{max_priority}")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
-            return []
-
-        # Build filter for priority range
-        priority_filter = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.priority",
-                    range=models.Range(
-                        gte=min_priority,
-                        lte=max_priority
-                    )
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=priority_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
+            return GoalBatch.empty() if return_format == "soa" else []
 
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        found_triples = self._goal_results(_priority_filter(min_priority, max_priority), limit, return_metadata, return_format)
 
         logging.info(f"Found {len(found_triples)} goals in priority range {min_priority}-{max_priority}")
         return found_triples
 
-    def query_active_goals(self, limit: int = 100, return_metadata: bool = True) -> List:
+    def query_active_goals(self, limit: int = 100, return_metadata: bool = True,
+                           return_format: str = "aos") -> Any:
         """
         Query all active goals (pending, in_progress, or ongoing status).
 
         Args:
             limit: Maximum number of results
             return_metadata: Whether to return metadata
+            return_format: "aos" for a list of triples, or "soa" for a GoalBatch
+                           of parallel columns (return_metadata is ignored)
 
         Returns:
-            List of active goal triples
+            List of active goal triples (a GoalBatch for "soa")
         """
         logging.info(f"Querying active goals")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
-            return []
-
-        # Build filter for active statuses (including ongoing for forever goals)
-        active_filter = models.Filter(
-            should=[
-                models.FieldCondition(
-                    key="metadata.goal_status",
-                    match=models.MatchValue(value="pending")
-                ),
-                models.FieldCondition(
-                    key="metadata.goal_status",
-                    match=models.MatchValue(value="in_progress")
-                ),
-                models.FieldCondition(
-                    key="metadata.goal_status",
-                    match=models.MatchValue(value="ongoing")
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=active_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
+            return GoalBatch.empty() if return_format == "soa" else []
 
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        found_triples = self._goal_results(_ACTIVE_GOALS_FILTER, limit, return_metadata, return_format)
 
         logging.info(f"Found {len(found_triples)} active goals")
         return found_triples
@@ -1041,40 +2251,12 @@ class VectorKnowledgeGraph:
         """
         logging.info(f"Querying instrumental/forever goals")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return []
 
-        # Build filter for forever goals
-        forever_filter = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.is_forever_goal",
-                    match=models.MatchValue(value=True)
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=forever_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
-
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        forever_filter = _metadata_filter((("is_forever_goal", True),))
+        found_triples = list(self._iter_filtered(forever_filter, limit, return_metadata))
 
         logging.info(f"Found {len(found_triples)} instrumental/forever goals")
         return found_triples
@@ -1093,63 +2275,60 @@ class VectorKnowledgeGraph:
         """
         logging.info(f"Querying high-priority goals (>= {min_priority})")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return []
 
         # Build filter for high priority and active status
-        high_priority_filter = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.priority",
-                    range=models.Range(
-                        gte=min_priority
-                    )
-                ),
-                # Only active goals
-                models.Filter(
-                    should=[
-                        models.FieldCondition(
-                            key="metadata.goal_status",
-                            match=models.MatchValue(value="pending")
-                        ),
-                        models.FieldCondition(
-                            key="metadata.goal_status",
-                            match=models.MatchValue(value="in_progress")
-                        ),
-                        models.FieldCondition(
-                            key="metadata.goal_status",
-                            match=models.MatchValue(value="ongoing")
-                        )
-                    ]
-                )
-            ]
-        )
-
-        # Query with filter
-        results, _ = self.qdrant_client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=high_priority_filter,
-            limit=limit,
-            with_payload=True,
-            with_vectors=False
-        )
+        high_priority_filter = _high_priority_filter(min_priority)
 
-        found_triples = []
-        for hit in results:
-            payload = hit.payload
-            if payload:
-                triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                if return_metadata:
-                    metadata = payload.get("metadata", {})
-                    found_triples.append((triple, metadata))
-                else:
-                    found_triples.append(triple)
+        found_triples = list(self._iter_filtered(high_priority_filter, limit, return_metadata))
 
         logging.info(f"Found {len(found_triples)} high-priority goals")
         return found_triples
 
+    def _best_goal_hit(self, description: str, similarity_threshold: float) -> Optional[models.ScoredPoint]:
+        """Highest-scoring has_goal point whose object matches description, or None."""
+        description_embedding = self._encode([description])[0]
+
+        # Search for matching goals using object vector (goal description is the
+        # object). The relationship filter prunes non-goal triples inside the
+        # search; against a server it is served by the keyword index.
+        goal_filter = models.Filter(must=[
+            models.FieldCondition(key="relationship", match=models.MatchValue(value="has_goal"))
+        ])
+
+        def search(query_filter):
+            return self.qdrant_client.query_points(
+                collection_name=self.collection_name,
+                search_params=self._search_params,
+                query=description_embedding,
+                using="object",
+                query_filter=query_filter,
+                limit=10,
+                score_threshold=similarity_threshold,
+                with_payload=True,
+                with_vectors=False
+            ).points
+
+        if not self._local_storage:
+            search_results = search(goal_filter)
+            return search_results[0] if search_results else None
+
+        # Local storage would check the filter against every payload, so try
+        # an unfiltered search first and only fall back to the filter when
+        # non-goal triples filled all the slots.
+        search_results = search(None)
+        # Hits come back best first
+        best_hit = next(
+            (hit for hit in search_results if hit.payload and hit.payload.get("relationship") == "has_goal"),
+            None
+        )
+        if best_hit is None and len(search_results) == 10:
+            search_results = search(goal_filter)
+            best_hit = search_results[0] if search_results else None
+        return best_hit
+
     def query_goal_by_description(self, description: str, similarity_threshold: float = 0.5, return_metadata: bool = True) -> Optional[Tuple]:
         """
         Find a specific goal by its description using semantic search.
@@ -1164,44 +2343,20 @@ class VectorKnowledgeGraph:
         """
         logging.info(f"Searching for goal: '{description}'")
 
-        collection_info = self.qdrant_client.get_collection(self.collection_name)
-        if collection_info.points_count == 0:
+        if self._collection_is_empty():
             logging.warning(f"Collection '{self.collection_name}' is empty.")
             return None
 
-        # Generate embedding for description
-        description_embedding = self.embedding_model.encode([description])[0]
-
-        # Search for matching goals using object vector (goal description is the object)
-        search_results = self.qdrant_client.search(
-            collection_name=self.collection_name,
-            query_vector=("object", description_embedding.tolist()),
-            limit=10,
-            score_threshold=similarity_threshold,
-            with_payload=True,
-            with_vectors=False
-        )
-
-        # Filter for has_goal predicates and find best match
-        best_match = None
-        best_score = 0
-
-        for hit in search_results:
-            payload = hit.payload
-            if payload and payload.get("relationship") == "has_goal":
-                if hit.score > best_score:
-                    best_score = hit.score
-                    triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
-                    if return_metadata:
-                        metadata = payload.get("metadata", {})
-                        metadata['confidence'] = hit.score
-                        best_match = (triple, metadata)
-                    else:
-                        best_match = triple
-
-        if best_match:
-            logging.info(f"Found goal matching '{description}' with score {best_score:.3f}")
-            return best_match
+        best_hit = self._best_goal_hit(description, similarity_threshold)
+        if best_hit is not None:
+            payload = best_hit.payload
+            triple = (payload.get("subject"), payload.get("relationship"), payload.get("object"))
+            logging.info(f"Found goal matching '{description}' with score {best_hit.score:.3f}")
+            if return_metadata:
+                metadata = payload.get("metadata", {})
+                metadata['confidence'] = best_hit.score
+                return triple, metadata
+            return triple
 
         logging.info(f"No goal found matching '{description}'")
         return None
@@ -1210,6 +2365,11 @@ class VectorKnowledgeGraph:
         """
         Update metadata for a goal by finding it via semantic search and updating its payload.
 
+        A goal whose stored description equals goal_description exactly is
+        remembered, so later updates of it fetch the point by ID instead of
+        searching again. Fuzzy matches are searched every time, since a
+        closer goal may have been added since.
+
         Args:
             goal_description: Description of the goal to update
             updated_metadata: New metadata values to merge
@@ -1220,32 +2380,80 @@ class VectorKnowledgeGraph:
         logging.info(f"Updating goal metadata for: '{goal_description}'")
 
         # Find the goal
-        goal_result = self.query_goal_by_description(goal_description, similarity_threshold=0.5, return_metadata=True)
-        if not goal_result:
-            logging.warning(f"Could not find goal: '{goal_description}'")
+        if self._collection_is_empty():
+            logging.warning(f"Collection '{self.collection_name}' is empty.")
             return False
 
-        triple, existing_metadata = goal_result
+        goal_point, score = None, None
+        cached = self._goal_id_cache.get(goal_description)
+        if cached is not None:
+            point_id, score = cached
+            goal_point = self._retrieve_goal(point_id)
+            if goal_point is None:
+                # The goal was deleted; search for it again
+                self._goal_id_cache.pop(goal_description, None)
+        if goal_point is None:
+            goal_point = self._best_goal_hit(goal_description, similarity_threshold=0.5)
+            if goal_point is None:
+                logging.warning(f"Could not find goal: '{goal_description}'")
+                return False
+            score = goal_point.score
+            if goal_point.payload.get("object") == goal_description:
+                self._goal_id_cache[goal_description] = (goal_point.id, score)
+
+        # Merge metadata (the match confidence is recorded as before)
+        self._merge_goal_metadata(goal_point, {'confidence': score, **updated_metadata})
 
-        # Merge metadata
-        merged_metadata = {**existing_metadata, **updated_metadata}
-        merged_metadata['status_updated_timestamp'] = time.time()
+        logging.info(f"Successfully updated goal: '{goal_description}'")
+        return True
+
+    def update_goal_status(self, point_id: Any, status: str) -> bool:
+        """
+        Set a goal's status by point ID, without looking it up by description.
+
+        Args:
+            point_id: ID of the goal's point (deterministic for its triple, see _triple_id)
+            status: New goal status
+
+        Returns:
+            True if updated successfully, False if no goal has that ID
+        """
+        goal_point = self._retrieve_goal(point_id)
+        if goal_point is None:
+            logging.warning(f"Could not find goal with ID {point_id}")
+            return False
+        self._merge_goal_metadata(goal_point, {'goal_status': status})
+        logging.info(f"Set status of goal {point_id} to '{status}'")
+        return True
+
+    def _retrieve_goal(self, point_id: Any) -> Optional[models.Record]:
+        """The has_goal point with this ID, or None."""
+        points = self.qdrant_client.retrieve(
+            collection_name=self.collection_name,
+            ids=[point_id],
+            with_payload=True,
+            with_vectors=False
+        )
+        if points and points[0].payload and points[0].payload.get("relationship") == "has_goal":
+            return points[0]
+        return None
 
-        # Generate the point ID (same as in add_triples)
-        import hashlib
-        subject, relationship, obj = triple
-        triple_string = f"{subject}-{relationship}-{obj}"
-        point_id = hashlib.md5(triple_string.encode()).hexdigest()
+    def _merge_goal_metadata(self, goal_point: Any, updated_metadata: Dict[str, Any]):
+        """Merge updated_metadata into a goal point's stored metadata, by its ID."""
+        merged_metadata = {**goal_point.payload.get("metadata", {}), **updated_metadata}
+        merged_metadata['status_updated_timestamp'] = time.time()
 
-        # Update the point's payload
         self.qdrant_client.set_payload(
             collection_name=self.collection_name,
             payload={"metadata": merged_metadata},
-            points=[point_id]
+            points=[goal_point.id]
         )
-
-        logging.info(f"Successfully updated goal: '{goal_description}'")
-        return True
+        with self._search_cache_lock:
+            self._invalidate_search_cache(keep_subject_matrix=True)
+            self._patch_subject_matrix(
+                [goal_point.id],
+                [{**goal_point.payload, "metadata": merged_metadata}]
+            )
 
 def main():
     # Set up debug logging for testing
@@ -1257,7 +2465,7 @@ def main():
     logging.info("Testing basic triple operations...")
     
     # Create a test graph
-    kgraph = VectorKnowledgeGraph(path="Test_GraphStoreMemory")
+    kgraph = VectorKnowledgeGraph(in_memory=True)
     
     try:
         # Test triples - creating a more complex knowledge graph
@@ -1375,15 +2583,8 @@ def main():
     
     finally:
         logging.info("Test run completed")
-        # Clean up test data
         if hasattr(kgraph, 'qdrant_client'):
             kgraph.qdrant_client.close()
-        if os.path.exists("Test_GraphStoreMemory"):
-            shutil.rmtree("Test_GraphStoreMemory")
 
 if __name__ == "__main__":
     main()
-
-
-
-
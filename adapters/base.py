@@ -1,6 +1,10 @@
 """Abstract base class for all event source adapters."""
 
 import abc
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
 from event_bus import EventBus
 
 
@@ -22,3 +26,48 @@ class EventSourceAdapter(abc.ABC):
     @abc.abstractmethod
     async def stop(self) -> None:
         """Gracefully shut down the adapter."""
+
+
+class PendingMap(OrderedDict):
+    """
+    event_id -> routing state for events still awaiting a response.
+
+    Entries are normally popped by handle_response, but an event whose
+    response never arrives would otherwise stay forever. Whenever an entry
+    is added, entries older than ttl seconds, and the oldest beyond maxsize,
+    are evicted and passed to on_evict.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._added: Dict[str, float] = {}
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._added[key] = time.monotonic()
+        self._evict()
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._added.pop(key, None)
+
+    def pop(self, key, *default):
+        self._added.pop(key, None)
+        return super().pop(key, *default)
+
+    def clear(self) -> None:
+        super().clear()
+        self._added.clear()
+
+    def _evict(self) -> None:
+        # Insertion order is age order, so stale entries are at the front
+        cutoff = time.monotonic() - self.ttl
+        while self and (len(self) > self.maxsize or self._added[next(iter(self))] < cutoff):
+            key, value = self.popitem(last=False)
+            self._added.pop(key, None)
+            if self.on_evict is not None:
+                self.on_evict(key, value)
@@ -14,7 +14,9 @@ import hashlib
 import logging
 import os
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from adapters.base import EventSourceAdapter
 from event_bus import EventBus
@@ -22,6 +24,30 @@ from event_types import Event, EventPriority, EventType
 
 logger = logging.getLogger(__name__)
 
+# Fixed sections of the goal prompt built by _generate_goal_prompt
+_PROMPT_HEAD = "AUTONOMOUS MODE — Working on a specific goal.\n\nTARGET GOAL: "
+_PROGRESS_HEADER = "YOUR PREVIOUS PROGRESS ON THIS GOAL:"
+_ALL_GOALS_HEADER = "ALL ACTIVE GOALS:\n"
+_INSTRUCTIONS_HEAD = """INSTRUCTIONS:
+1. If this goal is broad (e.g., "Learn about X", "Research Y") and has NO sub-goals yet:
+   - Decompose it into 3-5 specific sub-goals using set_goal(desc, parent_goal=\""""
+_INSTRUCTIONS_TAIL = """\")
+   - Mark THIS goal as in_progress, then STOP — next round will assign sub-goals.
+2. If this goal already has sub-goals, do NOT work on it directly — the system will assign sub-goals.
+3. If this goal is specific enough to act on directly:
+   - Take ONE concrete step using ```run blocks
+   - You MUST use web-search or web-read skills to gather REAL information
+   - Use web-learn to permanently store important knowledge
+4. Only call mark_completed() when you have ACTUALLY done substantial work this session.
+5. After each step, summarize what you learned and what's next."""
+
+
+@lru_cache(maxsize=1024)
+def _session_id_for_goal(goal_desc: str) -> str:
+    """Memoized goal -> session_id hash; the same goals are re-suggested all run."""
+    h = hashlib.sha256(goal_desc.encode()).hexdigest()[:10]
+    return f"goal_{h}"
+
 
 class GoalAdapter(EventSourceAdapter):
     """
@@ -52,12 +78,27 @@ class GoalAdapter(EventSourceAdapter):
         self.rest_seconds = rest_seconds
 
         self._consecutive_count = 0
-        self._last_goal_time = 0.0
+        # Monotonic time before which no new goal event is produced
+        self._next_allowed = 0.0
+
+        # Own worker for the memory reads behind each goal tick, so slow
+        # embedding/Qdrant calls neither wait behind nor block other work on
+        # the loop's default executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="goal_adapter")
         self._enabled = True
 
         # Track the last goal we suggested so EventProcessor can journal it
         self._current_goal_desc: Optional[str] = None
 
+        # (build time, text) of the last workspace summary; goals change
+        # rarely, while StreamMonitor asks for the summary every turn
+        self._summary_cache: Optional[Tuple[float, str]] = None
+        self._summary_ttl = 15.0
+
+        # (goal key, prompt) of the last goal event, reused while the same
+        # goal is suggested again with nothing new recorded on it
+        self._last_prompt: Optional[Tuple[tuple, str]] = None
+
     @property
     def current_goal_description(self) -> Optional[str]:
         """The goal description currently being worked on."""
@@ -71,16 +112,26 @@ class GoalAdapter(EventSourceAdapter):
 
     async def stop(self) -> None:
         self._enabled = False
+        self._executor.shutdown(wait=False)
         logger.info("[GoalAdapter] Stopped")
 
     def reset_consecutive(self) -> None:
         """Called by EventProcessor when a user event is processed."""
         self._consecutive_count = 0
+        self._last_prompt = None
+
+    def invalidate_goal_cache(self) -> None:
+        """
+        Drop the cached workspace summary and goal prompt. Called through
+        EventProcessor.invalidate_goal_cache after every goal write, since
+        the prompt also lists sub-goals and the other active goals.
+        """
+        self._summary_cache = None
+        self._last_prompt = None
 
     def _goal_session_id(self, goal_desc: str) -> str:
         """Deterministic session_id for a goal (stable across restarts)."""
-        h = hashlib.sha256(goal_desc.encode()).hexdigest()[:10]
-        return f"goal_{h}"
+        return _session_id_for_goal(goal_desc)
 
     async def next_goal_event(self) -> Optional[Event]:
         """
@@ -90,10 +141,10 @@ class GoalAdapter(EventSourceAdapter):
         if not self._enabled:
             return None
 
-        # Respect cooldown
-        elapsed = time.time() - self._last_goal_time
-        if elapsed < self.cooldown_seconds:
-            await asyncio.sleep(self.cooldown_seconds - elapsed)
+        # Respect cooldown (monotonic, so wall-clock jumps don't stretch it)
+        delay = self._next_allowed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
         # Rest break after too many consecutive goals
         if self._consecutive_count >= self.max_consecutive:
@@ -106,8 +157,7 @@ class GoalAdapter(EventSourceAdapter):
 
         # Get the suggested goal from memory (run in executor to avoid
         # blocking the async event loop during embedding/ChromaDB calls)
-        loop = asyncio.get_running_loop()
-        suggestion = await loop.run_in_executor(None, self._get_suggestion)
+        suggestion = await self._run_in_executor(self._get_suggestion)
         if not suggestion:
             return None
 
@@ -115,8 +165,24 @@ class GoalAdapter(EventSourceAdapter):
         goal_metadata = suggestion.get("metadata", {})
         self._current_goal_desc = goal_desc
 
-        # Build prompt with journal context
-        prompt = self._generate_goal_prompt(goal_desc, goal_metadata, suggestion)
+        # Build prompt with journal context (its memory reads also run in
+        # the executor). A repeat of the last goal with no new journal entry
+        # or status update reuses the previous prompt.
+        prompt_key = (
+            goal_desc,
+            len(goal_metadata.get("journal_entries", [])),
+            goal_metadata.get("status_updated_timestamp"),
+            suggestion.get("reasoning", ""),
+        )
+        if self._last_prompt is not None and self._last_prompt[0] == prompt_key:
+            prompt = self._last_prompt[1]
+        else:
+            prompt = await self._run_in_executor(
+                self._generate_goal_prompt, goal_desc, goal_metadata, suggestion
+            )
+            if prompt is None:
+                return None
+            self._last_prompt = (prompt_key, prompt)
         session_id = self._goal_session_id(goal_desc)
 
         event = Event(
@@ -132,13 +198,24 @@ class GoalAdapter(EventSourceAdapter):
         )
 
         self._consecutive_count += 1
-        self._last_goal_time = time.time()
+        self._next_allowed = time.monotonic() + self.cooldown_seconds
         logger.info(
             f"[GoalAdapter] Generated event for goal '{goal_desc[:60]}' "
             f"(session={session_id}, consecutive={self._consecutive_count})"
         )
         return event
 
+    async def _run_in_executor(self, func, *args):
+        """
+        Run func on the adapter's worker thread. Returns None once stop()
+        has shut the worker down, which can happen while a tick is
+        sleeping or waiting on an earlier call.
+        """
+        if not self._enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
     def _get_suggestion(self) -> Optional[Dict]:
         """Get the next goal suggestion from memory."""
         try:
@@ -150,16 +227,14 @@ class GoalAdapter(EventSourceAdapter):
     def get_workspace_summary(self) -> str:
         """
         Build a brief summary of all active goal workspaces.
-        Used by StreamMonitor for cross-workspace awareness.
+        Used by StreamMonitor for cross-workspace awareness; the summary is
+        rebuilt at most every _summary_ttl seconds.
         """
+        cached = self._summary_cache
+        if cached is not None and time.monotonic() - cached[0] < self._summary_ttl:
+            return cached[1]
         try:
-            goals_text = self.memory.get_active_goals_for_prompt(
-                owner=self.agent_name, limit=10
-            )
-            if not goals_text:
-                return ""
-
-            # Also get journal entries for active goals
+            # One query gives both the active goals and their journals
             active_goals = self.memory.query_goals(
                 owner=self.agent_name, active_only=True, limit=10
             )
@@ -176,26 +251,35 @@ class GoalAdapter(EventSourceAdapter):
                     line += f"\n  Last progress: {last_entry.get('note', '')[:100]}"
                 lines.append(line)
 
-            return "\n".join(lines) if lines else ""
+            summary = "\n".join(lines)
+            self._summary_cache = (time.monotonic(), summary)
+            return summary
 
         except Exception as e:
             logger.error(f"[GoalAdapter] Error building workspace summary: {e}")
             return ""
 
-    def _get_subgoals(self, goal_desc: str) -> List[Dict]:
-        """Get sub-goals for a given parent goal with their status."""
+    @staticmethod
+    def _subgoal_status(subgoals: List) -> List[Dict]:
+        """(triple, metadata) sub-goal tuples as description/status dicts."""
+        return [
+            {
+                "description": t[2],
+                "status": m.get("goal_status", "pending"),
+            }
+            for t, m in subgoals
+        ]
+
+    def _get_goal_context(self, goal_desc: str) -> Tuple[str, List[Dict]]:
+        """Active-goals text and sub-goal status for a goal, in one memory call."""
         try:
-            subgoals = self.memory.get_subgoals(goal_desc, owner=self.agent_name)
-            return [
-                {
-                    "description": t[2],
-                    "status": m.get("goal_status", "pending"),
-                }
-                for t, m in subgoals
-            ]
+            context = self.memory.get_goal_context(
+                owner=self.agent_name, goal_description=goal_desc, limit=10
+            )
+            return context["active_goals"], self._subgoal_status(context["subgoals"])
         except Exception as e:
-            logger.error(f"[GoalAdapter] Error getting sub-goals: {e}")
-            return []
+            logger.error(f"[GoalAdapter] Error getting goal context: {e}")
+            return "", []
 
     def _generate_goal_prompt(
         self, goal_desc: str, goal_metadata: Dict, suggestion: Dict
@@ -204,58 +288,30 @@ class GoalAdapter(EventSourceAdapter):
         Build a prompt for a specific goal, including journal entries
         from previous work sessions and sub-goal status.
         """
-        # Get all active goals for context
-        try:
-            all_goals = self.memory.get_active_goals_for_prompt(
-                owner=self.agent_name, limit=10
-            )
-        except Exception:
-            all_goals = ""
+        # Get all active goals and this goal's sub-goals for context
+        all_goals, subgoals = self._get_goal_context(goal_desc)
 
         # Extract journal entries from this goal's metadata
         journal_entries = goal_metadata.get("journal_entries", [])
-        journal_text = ""
-        if journal_entries:
-            journal_lines = []
-            for entry in journal_entries[-5:]:  # last 5 entries
-                journal_lines.append(f"- {entry.get('note', '(no note)')}")
-            journal_text = "\n".join(journal_lines)
+        journal_text = "\n".join(
+            f"- {entry.get('note', '(no note)')}" for entry in journal_entries[-5:]  # last 5 entries
+        )
 
         reasoning = suggestion.get("reasoning", "")
 
-        # Get sub-goal status
-        subgoals = self._get_subgoals(goal_desc)
         subgoal_text = ""
         if subgoals:
-            sg_lines = []
-            for sg in subgoals:
-                sg_lines.append(f"- [{sg['status']}] {sg['description']}")
-            subgoal_text = "\nSUB-GOALS:\n" + "\n".join(sg_lines)
-
-        has_subgoals = len(subgoals) > 0
-
-        prompt = f"""AUTONOMOUS MODE — Working on a specific goal.
-
-TARGET GOAL: {goal_desc}
-{f"Why this goal: {reasoning}" if reasoning else ""}
-
-{"YOUR PREVIOUS PROGRESS ON THIS GOAL:" if journal_text else ""}
-{journal_text}
-{subgoal_text}
-
-ALL ACTIVE GOALS:
-{all_goals if all_goals else "(No goals set yet)"}
-
-INSTRUCTIONS:
-1. If this goal is broad (e.g., "Learn about X", "Research Y") and has NO sub-goals yet:
-   - Decompose it into 3-5 specific sub-goals using set_goal(desc, parent_goal="{goal_desc}")
-   - Mark THIS goal as in_progress, then STOP — next round will assign sub-goals.
-2. If this goal already has sub-goals, do NOT work on it directly — the system will assign sub-goals.
-3. If this goal is specific enough to act on directly:
-   - Take ONE concrete step using ```run blocks
-   - You MUST use web-search or web-read skills to gather REAL information
-   - Use web-learn to permanently store important knowledge
-4. Only call mark_completed() when you have ACTUALLY done substantial work this session.
-5. After each step, summarize what you learned and what's next."""
+            subgoal_text = "\nSUB-GOALS:\n" + "\n".join(
+                f"- [{sg['status']}] {sg['description']}" for sg in subgoals
+            )
 
-        return prompt
+        # Only the per-goal slots are formatted; the fixed text is shared
+        return "".join((
+            _PROMPT_HEAD, goal_desc, "\n",
+            f"Why this goal: {reasoning}" if reasoning else "", "\n\n",
+            _PROGRESS_HEADER if journal_text else "", "\n",
+            journal_text, "\n",
+            subgoal_text, "\n\n",
+            _ALL_GOALS_HEADER, all_goals if all_goals else "(No goals set yet)", "\n\n",
+            _INSTRUCTIONS_HEAD, goal_desc, _INSTRUCTIONS_TAIL,
+        ))
@@ -6,8 +6,9 @@ in sophia_config.yaml under event_sources.scheduler.jobs.
 """
 
 import asyncio
+import heapq
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from adapters.base import EventSourceAdapter
 from event_bus import EventBus
@@ -35,7 +36,8 @@ class SchedulerAdapter(EventSourceAdapter):
         self._tasks: List[asyncio.Task] = []
 
     async def start(self) -> None:
-        """Start an asyncio task for each configured job."""
+        """Start one dispatcher task that fires every configured job."""
+        schedule = []
         for job in self.jobs:
             job_id = job.get("id", "unnamed")
             interval = job.get("interval_seconds", 3600)
@@ -45,15 +47,16 @@ class SchedulerAdapter(EventSourceAdapter):
                 logger.warning(f"[SchedulerAdapter] Skipping job '{job_id}' — no prompt")
                 continue
 
-            task = asyncio.create_task(
-                self._run_job(job_id, prompt, interval),
-                name=f"scheduler_{job_id}",
-            )
-            self._tasks.append(task)
+            schedule.append((job_id, prompt, interval))
             logger.info(
                 f"[SchedulerAdapter] Scheduled job '{job_id}' every {interval}s"
             )
 
+        if schedule:
+            self._tasks.append(asyncio.create_task(
+                self._run_schedule(schedule), name="scheduler_dispatch"
+            ))
+
     async def stop(self) -> None:
         """Cancel all running scheduler tasks."""
         for task in self._tasks:
@@ -63,12 +66,28 @@ class SchedulerAdapter(EventSourceAdapter):
         self._tasks.clear()
         logger.info("[SchedulerAdapter] Stopped")
 
-    async def _run_job(self, job_id: str, prompt: str, interval: int) -> None:
-        """Loop forever, sleeping then enqueuing an event."""
-        # Initial delay so the system can warm up
-        await asyncio.sleep(interval)
+    async def _run_schedule(self, schedule: List[Tuple[str, str, float]]) -> None:
+        """
+        Loop forever, sleeping until the next due job and enqueuing its event.
+
+        Jobs sit in a heap ordered by their next fire time. Fire times advance
+        from the schedule, not from when the event was put, so the intervals
+        do not drift; fires missed while the loop was blocked are skipped
+        rather than replayed in a burst.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # Initial delay of one interval so the system can warm up
+        heap = [(now + interval, seq, job_id, prompt, interval)
+                for seq, (job_id, prompt, interval) in enumerate(schedule)]
+        heapq.heapify(heap)
 
         while True:
+            next_fire, seq, job_id, prompt, interval = heap[0]
+            delay = next_fire - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
             event = Event(
                 event_type=EventType.CRON_TRIGGER,
                 payload={
@@ -83,4 +102,8 @@ class SchedulerAdapter(EventSourceAdapter):
             await self.bus.put(event)
             logger.info(f"[SchedulerAdapter] Fired job '{job_id}'")
 
-            await asyncio.sleep(interval)
+            next_fire += interval
+            now = loop.time()
+            if next_fire <= now:
+                next_fire += (now - next_fire) // interval * interval + interval
+            heapq.heapreplace(heap, (next_fire, seq, job_id, prompt, interval))
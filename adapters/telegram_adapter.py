@@ -5,11 +5,13 @@ Uses python-telegram-bot (async). Enabled via config when TELEGRAM_BOT_TOKEN
 is set and telegram.enabled is true.
 """
 
+from __future__ import annotations
+
 import asyncio
 import logging
 from typing import List, Optional, Set
 
-from adapters.base import EventSourceAdapter
+from adapters.base import EventSourceAdapter, PendingMap
 from event_bus import EventBus
 from event_types import Event, EventPriority, EventType
 
@@ -28,6 +30,35 @@ try:
 except ImportError:
     HAS_TELEGRAM = False
 
+# Telegram's per-message text limit
+MAX_MESSAGE_LENGTH = 4096
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into as few chunks of at most limit chars as possible,
+    breaking at the last newline (else space) before the limit so words
+    and lines are not cut in half. Unbreakable runs are split hard.
+
+    Each chunk is packed as full as the breaks allow, so a short last chunk
+    never fits into the one before it. Blank chunks are dropped (Telegram
+    rejects empty messages), so blank text gives no chunks at all.
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > limit:
+        end = start + limit
+        cut = text.rfind("\n", start, end)
+        if cut <= start:
+            cut = text.rfind(" ", start, end)
+        if cut <= start:
+            cut = end
+        chunks.append(text[start:cut])
+        # Drop the separator we broke on
+        start = cut + 1 if cut < end and text[cut] in "\n " else cut
+    chunks.append(text[start:])
+    return [chunk for chunk in chunks if chunk.strip()]
+
 
 class TelegramAdapter(EventSourceAdapter):
     """
@@ -52,8 +83,9 @@ class TelegramAdapter(EventSourceAdapter):
         self.allowed_chat_ids: Set[int] = set(allowed_chat_ids or [])
         self._app: Optional[Application] = None
 
-        # Map event_id -> chat_id so we can route responses
-        self._pending_chat_ids: dict[str, int] = {}
+        # Map event_id -> chat_id so we can route responses (bounded, since
+        # an event whose response is lost would never be popped)
+        self._pending_chat_ids: PendingMap = PendingMap()
 
     async def start(self) -> None:
         """Build and start the Telegram bot."""
@@ -133,8 +165,9 @@ class TelegramAdapter(EventSourceAdapter):
             logger.warning(f"[TelegramAdapter] Cannot route response for event {event.event_id}")
             return
 
-        # Telegram has a 4096-char limit per message
-        for i in range(0, len(response), 4096):
-            await self._app.bot.send_message(chat_id=chat_id, text=response[i : i + 4096])
+        # Telegram has a 4096-char limit per message. Chunks go out one at a
+        # time: concurrent sends could arrive out of order.
+        for chunk in split_message(response):
+            await self._app.bot.send_message(chat_id=chat_id, text=chunk)
 
         logger.info(f"[TelegramAdapter] Sent response to chat_id={chat_id}")
@@ -8,9 +8,8 @@ and the HTTP handler awaits it, preserving full backward compatibility.
 
 import asyncio
 import logging
-from typing import Dict
 
-from adapters.base import EventSourceAdapter
+from adapters.base import EventSourceAdapter, PendingMap
 from event_bus import EventBus
 from event_types import Event, EventPriority, EventType
 
@@ -29,8 +28,20 @@ class WebUIAdapter(EventSourceAdapter):
 
     def __init__(self, bus: EventBus):
         super().__init__(bus)
-        # Map event_id -> Future that the HTTP handler is awaiting
-        self._pending: Dict[str, asyncio.Future] = {}
+        # Map event_id -> Future (or streaming Queue) that the HTTP handler
+        # is awaiting; entries whose response never comes are evicted
+        self._pending: PendingMap = PendingMap(
+            on_evict=self._on_evict
+        )
+
+    @staticmethod
+    def _on_evict(event_id: str, pending) -> None:
+        """Release the HTTP handler waiting on an abandoned event."""
+        logger.warning(f"[WebUIAdapter] Dropping stale pending event {event_id}")
+        if isinstance(pending, asyncio.Queue):
+            pending.put_nowait(("error", {"message": "Request expired before a response was produced"}))
+        elif not pending.done():
+            pending.cancel()
 
     async def start(self) -> None:
         """No background work — events are created on-demand by submit()."""
@@ -446,6 +446,8 @@ async def create_goal(request: GoalCreateRequest):
             depends_on=request.depends_on,
             source="web_ui"
         )
+        if _event_processor is not None:
+            _event_processor.invalidate_goal_cache()
 
         return {
             "success": True,
@@ -471,6 +473,8 @@ async def update_goal(request: GoalUpdateRequest):
             blocker_reason=request.blocker_reason,
             completion_notes=request.completion_notes
         )
+        if success and _event_processor is not None:
+            _event_processor.invalidate_goal_cache()
 
         if success:
             return {
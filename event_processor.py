@@ -52,6 +52,7 @@ class EventProcessor:
         memory_system=None,
         rate_limit_per_hour: int = 120,
         skill_env_config=None,
+        activity_file: Optional[str] = None,
     ):
         self.bus = bus
         self.sophia_chat = sophia_chat
@@ -77,7 +78,7 @@ class EventProcessor:
         self._running = False
 
         # Activity log (Feature 2) — persisted to JSONL
-        self._activity_file = os.path.join(
+        self._activity_file = activity_file or os.path.join(
             os.path.dirname(os.path.abspath(__file__)), "logs", "activity.jsonl"
         )
         self._activity_log: collections.deque = collections.deque(maxlen=500)
@@ -92,6 +93,11 @@ class EventProcessor:
         self._goal_adapter = adapter
         logger.info("[EventProcessor] Goal adapter connected — continuous mode enabled")
 
+    def invalidate_goal_cache(self) -> None:
+        """Tell the goal adapter that goals changed, so it drops its cached prompt and summary."""
+        if self._goal_adapter:
+            self._goal_adapter.invalidate_goal_cache()
+
     def register_response_handler(
         self,
         channel: str,
@@ -439,6 +445,7 @@ class EventProcessor:
                 goal_desc,
                 note,
             )
+            self.invalidate_goal_cache()
             logger.info(
                 f"[EventProcessor] Journaled progress for '{goal_desc[:50]}': "
                 f"{note[:80]}"
@@ -233,6 +233,12 @@ async def build_and_run() -> None:
                 logger.error(f"Error stopping {type(adapter).__name__}: {e}")
 
         processor.stop()
+
+        # Persist the subject index so the next start skips the rebuild scroll
+        try:
+            kgraph.save()
+        except Exception as e:
+            logger.error(f"Error saving knowledge graph subject index: {e}")
         logger.info("SophiaAMS shutdown complete")
 
 
@@ -177,7 +177,7 @@ class TestEventBus:
 # ============================================================================
 
 class TestEventProcessor:
-    def test_processes_event_and_routes_response(self):
+    def test_processes_event_and_routes_response(self, tmp_path):
         """EventProcessor calls sophia_chat and routes response to handler."""
         from event_processor import EventProcessor
 
@@ -191,7 +191,9 @@ class TestEventProcessor:
             async def mock_handler(event, response):
                 responses_received.append((event.event_id, response))
 
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, activity_file=str(tmp_path / "activity.jsonl")
+            )
             processor.register_response_handler("webui", mock_handler)
 
             event = Event(
@@ -218,7 +220,7 @@ class TestEventProcessor:
 
         asyncio.run(_test())
 
-    def test_rate_limiting(self):
+    def test_rate_limiting(self, tmp_path):
         """Non-user events are rate-limited."""
         from event_processor import EventProcessor
 
@@ -231,7 +233,9 @@ class TestEventProcessor:
                 call_count += 1
                 return "ok"
 
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat, rate_limit_per_hour=2)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, rate_limit_per_hour=2, activity_file=str(tmp_path / "activity.jsonl")
+            )
 
             # Put 3 non-user events + shutdown
             for i in range(3):
@@ -256,7 +260,7 @@ class TestEventProcessor:
 
         asyncio.run(_test())
 
-    def test_user_events_bypass_rate_limit(self):
+    def test_user_events_bypass_rate_limit(self, tmp_path):
         """User events are never rate-limited."""
         from event_processor import EventProcessor
 
@@ -270,7 +274,9 @@ class TestEventProcessor:
                 return "ok"
 
             # rate limit = 0 for non-user, but user events should still work
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat, rate_limit_per_hour=0)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, rate_limit_per_hour=0, activity_file=str(tmp_path / "activity.jsonl")
+            )
 
             await bus.put(Event(
                 event_type=EventType.CHAT_MESSAGE,
@@ -291,7 +297,7 @@ class TestEventProcessor:
 
         asyncio.run(_test())
 
-    def test_self_schedule_parsing(self):
+    def test_self_schedule_parsing(self, tmp_path):
         """Agent responses with [SCHEDULE: N | prompt] create delayed events."""
         from event_processor import EventProcessor
 
@@ -301,7 +307,9 @@ class TestEventProcessor:
             def mock_chat(session_id, content):
                 return "Done. [SCHEDULE: 1 | Check on my progress]"
 
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, activity_file=str(tmp_path / "activity.jsonl")
+            )
 
             await bus.put(Event(
                 event_type=EventType.CHAT_MESSAGE,
@@ -330,7 +338,7 @@ class TestEventProcessor:
 
         asyncio.run(_test())
 
-    def test_continuous_loop_with_goal_adapter(self):
+    def test_continuous_loop_with_goal_adapter(self, tmp_path):
         """When bus is empty, processor asks GoalAdapter for work."""
         from event_processor import EventProcessor
         from adapters.goal_adapter import GoalAdapter
@@ -347,10 +355,14 @@ class TestEventProcessor:
             class FakeMemory:
                 def get_active_goals_for_prompt(self, owner, limit):
                     return "- Learn Python async"
+                def get_goal_context(self, owner, goal_description, limit):
+                    return {"active_goals": "- Learn Python async", "subgoals": []}
                 def suggest_next_goal(self, owner):
                     return {"goal_description": "Learn Python async", "reasoning": "curious"}
 
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, activity_file=str(tmp_path / "activity.jsonl")
+            )
             goal_adapter = GoalAdapter(
                 bus=bus,
                 memory_system=FakeMemory(),
@@ -378,7 +390,7 @@ class TestEventProcessor:
 
         asyncio.run(_test())
 
-    def test_user_event_preempts_goals(self):
+    def test_user_event_preempts_goals(self, tmp_path):
         """User events are processed before goal events."""
         from event_processor import EventProcessor
         from adapters.goal_adapter import GoalAdapter
@@ -397,10 +409,14 @@ class TestEventProcessor:
             class FakeMemory:
                 def get_active_goals_for_prompt(self, owner, limit):
                     return "- Some goal"
+                def get_goal_context(self, owner, goal_description, limit):
+                    return {"active_goals": "- Some goal", "subgoals": []}
                 def suggest_next_goal(self, owner):
                     return {"goal_description": "Some goal"}
 
-            processor = EventProcessor(bus=bus, sophia_chat=mock_chat)
+            processor = EventProcessor(
+                bus=bus, sophia_chat=mock_chat, activity_file=str(tmp_path / "activity.jsonl")
+            )
             goal_adapter = GoalAdapter(
                 bus=bus, memory_system=FakeMemory(),
                 cooldown_seconds=0, max_consecutive_goals=100, rest_seconds=0,
@@ -430,3 +446,225 @@ class TestEventProcessor:
             assert order[0] == "user"
 
         asyncio.run(_test())
+
+
+class TestGoalAdapter:
+    def test_goal_session_id_is_stable(self):
+        import hashlib
+        from adapters.goal_adapter import GoalAdapter
+
+        adapter = GoalAdapter(bus=EventBus(), memory_system=None)
+        goal = "Learn about the Roman Empire"
+        expected = "goal_" + hashlib.sha256(goal.encode()).hexdigest()[:10]
+        assert adapter._goal_session_id(goal) == expected
+        assert adapter._goal_session_id(goal) == expected
+        assert adapter._goal_session_id("Another goal") != expected
+
+    def test_goal_prompt_reads_context_once(self):
+        from adapters.goal_adapter import GoalAdapter
+
+        calls = []
+
+        class FakeMemory:
+            def get_goal_context(self, owner, goal_description, limit):
+                calls.append(goal_description)
+                return {
+                    "active_goals": "- Learn Rust",
+                    "subgoals": [(("Sophia", "has_goal", "Read the book"), {"goal_status": "completed"})],
+                }
+
+        adapter = GoalAdapter(bus=EventBus(), memory_system=FakeMemory())
+        prompt = adapter._generate_goal_prompt("Learn Rust", {}, {})
+        assert calls == ["Learn Rust"]
+        assert "ALL ACTIVE GOALS:\n- Learn Rust" in prompt
+        assert "- [completed] Read the book" in prompt
+
+    def test_workspace_summary_is_cached(self):
+        from adapters.goal_adapter import GoalAdapter
+
+        calls = []
+
+        class FakeMemory:
+            def query_goals(self, owner, active_only, limit):
+                calls.append(owner)
+                return [(("Sophia", "has_goal", "Learn Rust"),
+                         {"goal_status": "pending", "journal_entries": [{"note": "Read chapter 1"}]})]
+
+        adapter = GoalAdapter(bus=EventBus(), memory_system=FakeMemory())
+        expected = "- [pending] Learn Rust\n  Last progress: Read chapter 1"
+        assert adapter.get_workspace_summary() == expected
+        assert adapter.get_workspace_summary() == expected
+        assert len(calls) == 1
+        adapter.invalidate_goal_cache()
+        adapter.get_workspace_summary()
+        assert len(calls) == 2
+
+    def test_repeated_goal_reuses_prompt(self):
+        from adapters.goal_adapter import GoalAdapter
+
+        contexts = []
+
+        class FakeMemory:
+            journal = []
+
+            def suggest_next_goal(self, owner):
+                return {"goal_description": "Learn Rust", "metadata": {"journal_entries": list(self.journal)}}
+
+            def get_goal_context(self, owner, goal_description, limit):
+                contexts.append(goal_description)
+                return {"active_goals": "- Learn Rust", "subgoals": []}
+
+        memory = FakeMemory()
+        adapter = GoalAdapter(bus=EventBus(), memory_system=memory, cooldown_seconds=0)
+
+        async def _test():
+            first = await adapter.next_goal_event()
+            second = await adapter.next_goal_event()
+            assert second.payload["content"] == first.payload["content"]
+            assert second.event_id != first.event_id
+            assert len(contexts) == 1
+            memory.journal.append({"note": "Read chapter 1"})
+            third = await adapter.next_goal_event()
+            assert "Read chapter 1" in third.payload["content"]
+            assert len(contexts) == 2
+
+        asyncio.run(_test())
+
+    def test_stop_during_tick_returns_no_event(self):
+        import threading
+        from adapters.goal_adapter import GoalAdapter
+
+        release = threading.Event()
+
+        class FakeMemory:
+            def suggest_next_goal(self, owner):
+                release.wait(5)
+                return {"goal_description": "Learn Rust", "metadata": {}}
+
+            def get_goal_context(self, owner, goal_description, limit):
+                return {"active_goals": "", "subgoals": []}
+
+        adapter = GoalAdapter(bus=EventBus(), memory_system=FakeMemory(), cooldown_seconds=0)
+
+        async def _test():
+            tick = asyncio.create_task(adapter.next_goal_event())
+            await asyncio.sleep(0.05)
+            await adapter.stop()
+            release.set()
+            assert await tick is None
+
+        asyncio.run(_test())
+
+    def test_goal_write_drops_cached_prompt(self, tmp_path):
+        from adapters.goal_adapter import GoalAdapter
+        from event_processor import EventProcessor
+
+        contexts = []
+
+        class FakeMemory:
+            subgoals = []
+
+            def suggest_next_goal(self, owner):
+                return {"goal_description": "Learn Rust", "metadata": {}}
+
+            def get_goal_context(self, owner, goal_description, limit):
+                contexts.append(goal_description)
+                return {"active_goals": "- Learn Rust", "subgoals": list(self.subgoals)}
+
+        memory = FakeMemory()
+        adapter = GoalAdapter(bus=EventBus(), memory_system=memory, cooldown_seconds=0)
+        processor = EventProcessor(
+            bus=EventBus(), sophia_chat=lambda s, c: "", activity_file=str(tmp_path / "activity.jsonl")
+        )
+        processor.set_goal_adapter(adapter)
+
+        async def _test():
+            await adapter.next_goal_event()
+            memory.subgoals.append((("Sophia", "has_goal", "Read the book"), {"goal_status": "pending"}))
+            processor.invalidate_goal_cache()
+            event = await adapter.next_goal_event()
+            assert "- [pending] Read the book" in event.payload["content"]
+            assert len(contexts) == 2
+
+        asyncio.run(_test())
+
+
+class TestPendingMap:
+    def test_evicts_oldest_beyond_maxsize(self):
+        from adapters.base import PendingMap
+
+        evicted = []
+        pending = PendingMap(maxsize=2, on_evict=lambda key, value: evicted.append(key))
+        for key in ("a", "b", "c"):
+            pending[key] = key.upper()
+        assert list(pending) == ["b", "c"]
+        assert evicted == ["a"]
+        assert pending.pop("b") == "B"
+        assert pending.pop("missing", None) is None
+
+    def test_evicts_expired_entries(self):
+        from adapters.base import PendingMap
+
+        pending = PendingMap(ttl=0.05)
+        pending["old"] = 1
+        time.sleep(0.1)
+        pending["new"] = 2
+        assert list(pending) == ["new"]
+
+    def test_webui_cancels_abandoned_futures(self):
+        from adapters.webui_adapter import WebUIAdapter
+
+        async def _test():
+            adapter = WebUIAdapter(EventBus())
+            adapter._pending.maxsize = 1
+            first = await adapter.submit("s", "hello")
+            await adapter.submit("s", "again")
+            assert first.cancelled()
+
+        asyncio.run(_test())
+
+
+class TestSchedulerAdapter:
+    def test_one_task_fires_all_jobs_on_schedule(self):
+        from adapters.scheduler_adapter import SchedulerAdapter
+
+        async def _test():
+            bus = EventBus()
+            scheduler = SchedulerAdapter(bus, jobs=[
+                {"id": "fast", "prompt": "tick", "interval_seconds": 0.1},
+                {"id": "slow", "prompt": "tock", "interval_seconds": 0.25},
+                {"id": "empty", "prompt": ""},
+            ])
+            await scheduler.start()
+            assert len(scheduler._tasks) == 1
+            await asyncio.sleep(0.35)
+            await scheduler.stop()
+
+            fired = []
+            while not bus.empty():
+                fired.append((await bus.get()).metadata["job_id"])
+            assert fired.count("fast") == 3
+            assert fired.count("slow") == 1
+
+        asyncio.run(_test())
+
+
+class TestTelegramSplit:
+    def test_splits_at_line_and_word_breaks(self):
+        from adapters.telegram_adapter import split_message
+
+        assert split_message("short") == ["short"]
+        assert split_message("alpha beta gamma", limit=11) == ["alpha beta", "gamma"]
+        assert split_message("one\ntwo three", limit=10) == ["one", "two three"]
+        assert split_message("x" * 25, limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+        text = " ".join(f"word{i}" for i in range(2000))
+        chunks = split_message(text)
+        assert all(len(chunk) <= 4096 for chunk in chunks)
+        assert " ".join(chunks) == text
+
+    def test_blank_text_gives_no_chunks(self):
+        from adapters.telegram_adapter import split_message
+
+        assert split_message("") == []
+        assert split_message(" \n ") == []
+        assert split_message("x" * 10 + " ", limit=10) == ["x" * 10]
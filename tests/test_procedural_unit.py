@@ -11,8 +11,6 @@ Tests low-level components:
 
 import unittest
 import time
-import os
-import shutil
 from typing import List, Dict
 
 from triple_extraction import extract_triples_from_string
@@ -115,11 +113,7 @@ class TestProceduralQuery(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up test database once for all tests"""
-        cls.test_db_path = "Test_ProceduralQuery"
-        if os.path.exists(cls.test_db_path):
-            shutil.rmtree(cls.test_db_path)
-
-        cls.kgraph = VectorKnowledgeGraph(path=cls.test_db_path)
+        cls.kgraph = VectorKnowledgeGraph(in_memory=True)
         cls.memory = AssociativeSemanticMemory(cls.kgraph)
 
         # Ingest some procedural knowledge
@@ -148,9 +142,6 @@ class TestProceduralQuery(unittest.TestCase):
     def tearDownClass(cls):
         """Clean up test database"""
         cls.memory.close()
-        time.sleep(1)
-        if os.path.exists(cls.test_db_path):
-            shutil.rmtree(cls.test_db_path)
 
     def test_query_procedure_basic(self):
         """Test basic procedure query"""
@@ -339,14 +330,9 @@ class TestProceduralMetadata(unittest.TestCase):
     def test_confidence_metadata(self):
         """Test that confidence scores are present in query results"""
         # Need a memory instance for this
-        test_db = "Test_Confidence"
-        if os.path.exists(test_db):
-            shutil.rmtree(test_db)
-
+        kgraph = VectorKnowledgeGraph(in_memory=True)
+        memory = AssociativeSemanticMemory(kgraph)
         try:
-            kgraph = VectorKnowledgeGraph(path=test_db)
-            memory = AssociativeSemanticMemory(kgraph)
-
             # Ingest procedural knowledge
             memory.ingest_text("To test code, use pytest. Example: pytest tests/",
                              source="test")
@@ -361,12 +347,8 @@ class TestProceduralMetadata(unittest.TestCase):
                 confidence = metadata['confidence']
                 self.assertIsInstance(confidence, (int, float), "Confidence should be numeric")
                 self.assertGreaterEqual(confidence, 0, "Confidence should be >= 0")
-
-            memory.close()
         finally:
-            time.sleep(1)
-            if os.path.exists(test_db):
-                shutil.rmtree(test_db)
+            memory.close()
 
 
 class TestProceduralScoring(unittest.TestCase):
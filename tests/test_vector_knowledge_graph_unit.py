@@ -0,0 +1,677 @@
+"""
+Unit tests for VectorKnowledgeGraph internals.
+
+Uses a deterministic fake embedder so the tests run without downloading
+a SentenceTransformer model. Identical strings map to identical vectors;
+different strings map to (nearly) orthogonal ones.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from qdrant_client import models
+
+import VectorKnowledgeGraph as vkg_module
+from VectorKnowledgeGraph import VectorKnowledgeGraph
+
+EMBEDDING_DIM = 64
+
+
+class FakeEmbedder:
+    """Hash-seeded random unit vectors; counts every string it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        self.encoded.extend(sentences)
+        rows = []
+        for s in sentences:
+            seed = int.from_bytes(hashlib.md5(s.encode()).digest()[:4], "little")
+            v = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+            rows.append(v / np.linalg.norm(v))
+        return np.vstack(rows) if rows else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+
+def recommend_batch_sizes(spy):
+    """Request counts of the recommend-by-ID query_batch_points calls a spy saw."""
+    return [len(c.kwargs["requests"]) for c in spy.call_args_list
+            if isinstance(c.kwargs["requests"][0].query, models.RecommendQuery)]
+
+
+class VectorKnowledgeGraphTestCase(unittest.TestCase):
+    def setUp(self):
+        self.embedder = FakeEmbedder()
+        self.kgraph = VectorKnowledgeGraph(
+            embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, in_memory=True
+        )
+
+    def tearDown(self):
+        self.kgraph.qdrant_client.close()
+
+
+class TestServerClient(unittest.TestCase):
+    def test_qdrant_url_selects_grpc_server_client(self):
+        tmpdir = tempfile.mkdtemp(prefix="vkg_unit_")
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        with mock.patch.dict("os.environ", {"QDRANT_URL": "http://qdrant:6333"}), \
+                mock.patch("VectorKnowledgeGraph.QdrantClient") as client_cls:
+            kgraph = VectorKnowledgeGraph(embedding_model=FakeEmbedder(), embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        client_cls.assert_called_once_with(url="http://qdrant:6333", api_key=None, prefer_grpc=True, grpc_port=6334)
+        self.assertFalse(kgraph._local_storage)
+
+    def test_qdrant_url_warns_about_existing_embedded_store(self):
+        tmpdir = tempfile.mkdtemp(prefix="vkg_unit_")
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        os.makedirs(os.path.join(tmpdir, "qdrant_data", "collection"))
+        with mock.patch.dict("os.environ", {"QDRANT_URL": "http://qdrant:6333"}), \
+                mock.patch("VectorKnowledgeGraph.QdrantClient"), \
+                self.assertLogs(level="WARNING") as logs:
+            VectorKnowledgeGraph(embedding_model=FakeEmbedder(), embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        self.assertTrue(any("embedded Qdrant store" in line for line in logs.output))
+
+
+class TestSearchParams(VectorKnowledgeGraphTestCase):
+    def test_binary_collections_oversample_more(self):
+        self.assertEqual(self.kgraph._search_params.quantization.oversampling, 2.0)
+        info = mock.Mock()
+        info.config.quantization_config = vkg_module.models.BinaryQuantization(
+            binary=vkg_module.models.BinaryQuantizationConfig(always_ram=True)
+        )
+        with mock.patch.object(self.kgraph.qdrant_client, "get_collection", return_value=info):
+            self.kgraph._configure_search_params()
+        self.assertEqual(self.kgraph._search_params.quantization.oversampling, 3.0)
+
+
+class TestEmbeddingCache(VectorKnowledgeGraphTestCase):
+    def test_repeated_texts_encoded_once(self):
+        self.kgraph._encode(["cat", "dog"])
+        self.kgraph._encode(["dog", "cat", "bird"])
+        self.assertEqual(sorted(self.embedder.encoded), ["bird", "cat", "dog"])
+
+    def test_results_keep_input_order(self):
+        first = self.kgraph._encode(["cat", "dog"])
+        second = self.kgraph._encode(["dog", "cat", "dog"])
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[1], first[0])
+        np.testing.assert_array_equal(second[2], first[1])
+
+    def test_misses_are_encoded_shortest_first(self):
+        result = self.kgraph._encode(["a long sentence", "cat", "a dog"])
+        self.assertEqual(self.embedder.encoded, ["cat", "a dog", "a long sentence"])
+        np.testing.assert_array_equal(result[1], self.kgraph._encode(["cat"])[0])
+
+    def test_cache_holds_half_precision_vectors(self):
+        result = self.kgraph._encode(["cat"])
+        self.assertEqual(result.dtype, np.float32)
+        self.assertEqual(self.kgraph._emb_cache["cat"].dtype, np.float16)
+        np.testing.assert_allclose(np.linalg.norm(result[0]), 1.0, atol=1e-3)
+
+    def test_keys_ignore_whitespace_and_case_for_uncased_models(self):
+        self.kgraph._encode(["cat", " cat "])
+        self.assertEqual(self.embedder.encoded, ["cat"])
+
+        self.kgraph._emb_lowercase = True
+        self.kgraph._encode(["Cat", "CAT"])
+        self.assertEqual(self.embedder.encoded, ["cat"])
+
+    def test_cache_is_bounded(self):
+        self.kgraph._emb_cache_maxsize = 2
+        self.kgraph._encode(["a", "b", "c"])
+        self.assertEqual(list(self.kgraph._emb_cache), ["b", "c"])
+
+    def test_concurrent_misses_share_one_model_call_when_batching(self):
+        self.kgraph._encode_batch_wait = 0.2
+        results = {}
+        threads = [threading.Thread(target=lambda t=t: results.update({t: self.kgraph._encode([t])}))
+                   for t in ("cat", "dog", "bird")]
+        with mock.patch.object(self.embedder, "encode", side_effect=self.embedder.encode) as encode:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        encode.assert_called_once()
+        for text, result in results.items():
+            np.testing.assert_array_equal(result[0], self.kgraph._encode([text])[0])
+
+    def test_cache_size_from_env(self):
+        with mock.patch.dict("os.environ", {"EMBEDDING_CACHE_SIZE": "3"}):
+            kgraph = VectorKnowledgeGraph(embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, in_memory=True)
+        self.addCleanup(kgraph.qdrant_client.close)
+        self.assertEqual(kgraph._emb_cache_maxsize, 3)
+
+
+class TestDefaultModel(unittest.TestCase):
+    def test_default_model_is_loaded_lazily_and_shared(self):
+        with mock.patch.dict(vkg_module._MODEL_CACHE, clear=True), \
+                mock.patch.object(vkg_module, "_load_default_embedding_model",
+                                  return_value=FakeEmbedder()) as load:
+            first = VectorKnowledgeGraph(embedding_dim=EMBEDDING_DIM, in_memory=True)
+            second = VectorKnowledgeGraph(embedding_dim=EMBEDDING_DIM, in_memory=True)
+            self.addCleanup(first.qdrant_client.close)
+            self.addCleanup(second.qdrant_client.close)
+            load.assert_not_called()
+
+            first._encode(["cat"])
+            self.assertIs(second.embedding_model, first.embedding_model)
+        load.assert_called_once()
+
+
+class TestEntitySimilarities(VectorKnowledgeGraphTestCase):
+    def test_pairs_above_threshold_sorted_by_score(self):
+        entities = ["cat", "Cat ", "dog", "cat"]
+        self.kgraph._emb_lowercase = True
+        results = self.kgraph.compute_entity_similarities(entities, similarity_threshold=0.5)
+        self.assertEqual([(a, b) for a, b, _ in results], [("cat", "Cat "), ("cat", "cat"), ("Cat ", "cat")])
+        for _, _, score in results:
+            self.assertIsInstance(score, float)
+            self.assertAlmostEqual(score, 1.0, places=3)
+        self.assertEqual(self.kgraph.compute_entity_similarities(entities, similarity_threshold=1.1), [])
+
+
+class TestAddTriples(VectorKnowledgeGraphTestCase):
+    def test_readding_triple_reuses_stored_vectors(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird")], [{"source": "a"}])
+        self.kgraph._emb_cache.clear()
+        self.embedder.encoded.clear()
+
+        self.kgraph.add_triples([("cat", "hunts", "bird")], [{"source": "b"}])
+        self.assertEqual(self.embedder.encoded, [])
+        self.assertEqual(self.kgraph.qdrant_client.count(self.kgraph.collection_name).count, 1)
+        results = self.kgraph.query_triples_from_metadata({"source": "b"})
+        self.assertEqual(results[0][0], ("cat", "hunts", "bird"))
+
+    def test_new_triples_are_embedded_in_one_model_call(self):
+        with mock.patch.object(self.embedder, "encode", side_effect=self.embedder.encode) as encode:
+            self.kgraph.add_triples([("cat", "hunts", "bird"), ("dog", "has", "fur")],
+                                    [{"topics": ["pets", "animals"]}, {}])
+        encode.assert_called_once()
+        point = self.kgraph.qdrant_client.retrieve(
+            self.kgraph.collection_name, [self.kgraph._triple_id("dog", "has", "fur")], with_vectors=["topic_vector"]
+        )[0]
+        self.assertFalse(any(point.vector["topic_vector"]))
+
+    def test_topic_sets_embedded_once_per_batch(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("dog", "has", "fur"), ("cow", "eats", "grass")],
+                                [{"topics": ["pets", "animals"]}, {"topics": ["pets", "animals", "pets"]}, {}])
+        self.assertEqual(self.embedder.encoded.count("pets animals"), 1)
+        self.assertNotIn("pets animals pets", self.embedder.encoded)
+        results = self.kgraph.find_triples_by_vectorized_topics(["pets", "animals"], return_metadata=False,
+                                                                 similarity_threshold=0.9)
+        self.assertCountEqual(results, [("cat", "hunts", "bird"), ("dog", "has", "fur")])
+
+    def test_unchanged_triples_are_not_rewritten(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird")], [{"source": "a"}])
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "upsert", side_effect=client.upsert) as upsert:
+            self.kgraph.add_triples([("cat", "hunts", "bird"), ("cat", "has", "fur")],
+                                    [{"source": "a"}, {"source": "a"}])
+        self.assertEqual([c.kwargs["points"].ids for c in upsert.call_args_list],
+                         [[self.kgraph._triple_id("cat", "has", "fur")]])
+
+    def test_subject_index_survives_save_and_reload(self):
+        tmpdir = tempfile.mkdtemp(prefix="vkg_unit_")
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        kgraph = VectorKnowledgeGraph(embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        kgraph.add_triples([("cat", "hunts", "bird")])
+        kgraph.save()
+        kgraph.qdrant_client.close()
+
+        reopened = VectorKnowledgeGraph(embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        self.addCleanup(reopened.qdrant_client.close)
+        self.assertEqual(reopened._subject_to_id, kgraph._subject_to_id)
+
+    def test_missing_subject_index_is_rebuilt_on_first_traversal(self):
+        tmpdir = tempfile.mkdtemp(prefix="vkg_unit_")
+        self.addCleanup(shutil.rmtree, tmpdir, True)
+        kgraph = VectorKnowledgeGraph(embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        kgraph.add_triples([("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        kgraph.qdrant_client.close()
+
+        reopened = VectorKnowledgeGraph(embedding_model=self.embedder, embedding_dim=EMBEDDING_DIM, path=tmpdir)
+        self.addCleanup(reopened.qdrant_client.close)
+        reopened._subject_matrix_max_points = 0
+        self.assertEqual(reopened._subject_to_id, {})
+        self.embedder.encoded.clear()
+        results = reopened.build_graph_from_noun("cat", similarity_threshold=0.9, depth=1)
+        self.assertCountEqual(results, [("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        self.assertEqual(set(reopened._subject_to_id), {"cat", "bird"})
+        self.assertEqual(self.embedder.encoded, [])
+
+    def test_large_batches_are_upserted_in_chunks(self):
+        self.kgraph._upsert_chunk_size = 2
+        client = self.kgraph.qdrant_client
+        triples = [(f"cat {i}", "has", "fur") for i in range(5)]
+        with mock.patch.object(client, "upsert", side_effect=client.upsert) as upsert:
+            self.kgraph.add_triples(triples)
+        self.assertEqual([len(c.kwargs["points"].ids) for c in upsert.call_args_list], [2, 2, 1])
+        self.assertEqual([c.kwargs["wait"] for c in upsert.call_args_list], [False, False, True])
+        self.assertEqual(client.count(self.kgraph.collection_name).count, 5)
+
+    def test_server_upserts_keep_two_chunks_in_flight(self):
+        self.kgraph._local_storage = False
+        self.kgraph._upsert_chunk_size = 1
+        client = self.kgraph.qdrant_client
+        real_upsert = client.upsert
+        lock = threading.Lock()
+        in_flight = []
+        active = 0
+
+        def upsert(**kwargs):
+            nonlocal active
+            with lock:
+                active += 1
+                in_flight.append((active, kwargs["wait"]))
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+                return real_upsert(**kwargs)
+
+        with mock.patch.object(client, "upsert", side_effect=upsert):
+            self.kgraph.add_triples([(f"cat {i}", "has", "fur") for i in range(5)])
+        self.assertEqual(max(n for n, _ in in_flight), 2)
+        # The waiting upsert is only sent once every earlier chunk returned
+        self.assertEqual(in_flight[-1], (1, True))
+        self.assertEqual(client.count(self.kgraph.collection_name).count, 5)
+
+
+class TestSubjectMatrix(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.triples = [("cat", "hunts", "bird"), ("cat", "chases", "mouse"),
+                        ("bird", "eats", "seeds"), ("mouse", "eats", "cheese")]
+        self.kgraph.add_triples(self.triples, [{"source": str(i)} for i in range(len(self.triples))])
+
+    def traverse(self):
+        return self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=2, return_metadata=True)
+
+    def test_matrix_matches_qdrant_search_without_round_trips(self):
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "query_batch_points") as query:
+            from_matrix = self.traverse()
+        query.assert_not_called()
+
+        self.kgraph._subject_matrix_max_points = 0
+        self.kgraph._invalidate_search_cache()
+        from_qdrant = self.traverse()
+        self.assertEqual([t for t, _ in from_matrix], [t for t, _ in from_qdrant])
+        for (_, matrix_meta), (_, qdrant_meta) in zip(from_matrix, from_qdrant):
+            self.assertAlmostEqual(matrix_meta["confidence"], qdrant_meta["confidence"], places=3)
+            self.assertEqual(matrix_meta["source"], qdrant_meta["source"])
+
+    def test_matrix_patched_on_write_without_rescroll(self):
+        self.traverse()
+        self.kgraph.add_triples([("seeds", "grow", "plants"), ("cat", "hunts", "bird")],
+                                [{"source": "new"}, {"source": "updated"}])
+        with mock.patch.object(self.kgraph.qdrant_client, "scroll") as scroll:
+            patched = self.traverse()
+        scroll.assert_not_called()
+        self.assertIn(("seeds", "grow", "plants"), [t for t, _ in patched])
+
+        self.kgraph._invalidate_search_cache()
+        rebuilt = self.traverse()
+        self.assertEqual([t for t, _ in patched], [t for t, _ in rebuilt])
+        self.assertEqual([m["source"] for _, m in patched], [m["source"] for _, m in rebuilt])
+
+    def test_server_mode_queries_qdrant(self):
+        self.kgraph._local_storage = False
+        self.assertIsNone(self.kgraph._subject_matrix_snapshot())
+
+
+class TestSubjectRelationship(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kgraph.add_triples(
+            [("cat", "hunts", "bird"), ("cat", "has", "fur"), ("dog", "hunts", "cat")],
+            [{"source": "a"}, {"source": "b"}, {"source": "c"}]
+        )
+
+    def assert_finds_cat_triples(self):
+        # The verb search is not thresholded, so on a tiny collection every
+        # relationship is "near" the verb; only the subject must match
+        results = self.kgraph.build_graph_from_subject_relationship(
+            ("cat", "hunts"), similarity_threshold=0.9, return_metadata=True
+        )
+        self.assertCountEqual([t for t, _ in results], [("cat", "hunts", "bird"), ("cat", "has", "fur")])
+        for triple, metadata in results:
+            self.assertEqual(metadata["source"], "a" if triple[1] == "hunts" else "b")
+            # Confidence is the weaker of the subject and verb matches
+            if triple[1] == "hunts":
+                self.assertGreater(metadata["confidence"], 0.9)
+            else:
+                self.assertLess(metadata["confidence"], 0.5)
+
+    def test_local_storage_intersects_subject_and_verb_hits(self):
+        self.assert_finds_cat_triples()
+
+    def test_server_mode_filters_on_nearest_relationships(self):
+        self.kgraph._local_storage = False
+        self.assert_finds_cat_triples()
+
+        results = self.kgraph.build_graph_from_subject_relationship(
+            ("cat", "hunts"), similarity_threshold=0.9, max_results=1
+        )
+        self.assertEqual(results, [("cat", "hunts", "bird")])
+
+    def test_repeat_lookup_served_from_cache_until_write(self):
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "query_batch_points", side_effect=client.query_batch_points) as spy:
+            self.assert_finds_cat_triples()
+            self.assert_finds_cat_triples()
+            self.assertEqual(spy.call_count, 1)
+            self.kgraph.add_triples([("cat", "eats", "fish")])
+            self.kgraph.build_graph_from_subject_relationship(("cat", "hunts"), similarity_threshold=0.9)
+            self.assertEqual(spy.call_count, 2)
+
+    def test_local_point_count_does_not_expire(self):
+        self.kgraph._point_count_ttl = 0.0
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "get_collection", side_effect=client.get_collection) as spy:
+            self.kgraph.build_graph_from_noun("cat")
+            self.kgraph.build_graph_from_noun("cat")
+        self.assertEqual(spy.call_count, 1)
+
+
+class TestScrollQueries(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.triples = [(f"cat {i}", "has", "fur") for i in range(5)]
+        self.kgraph.add_triples(self.triples, [{"source": "a"}] * 5)
+        self.kgraph.add_triples([("dog", "has", "fur")], [{"source": "b"}])
+
+    def test_metadata_query_pages_until_exhausted(self):
+        results = list(self.kgraph.iter_triples_from_metadata({"source": "a"}, page_size=2))
+        self.assertEqual(sorted(t for t, _ in results), sorted(self.triples))
+
+    def test_metadata_filter_reused_for_repeated_criteria(self):
+        list(self.kgraph.iter_triples_from_metadata({"source": "a"}))
+        hits = vkg_module._metadata_filter.cache_info().hits
+        results = list(self.kgraph.iter_triples_from_metadata({"source": "a"}))
+        self.assertEqual(vkg_module._metadata_filter.cache_info().hits, hits + 1)
+        self.assertEqual(len(results), 5)
+
+    def test_all_triples_pages_until_exhausted(self):
+        results = list(self.kgraph.iter_all_triples(page_size=2))
+        self.assertEqual(len(results), 6)
+        self.assertEqual({r["metadata"]["source"] for r in results}, {"a", "b"})
+
+    def test_metadata_index_skipped_on_local_storage(self):
+        with mock.patch.object(self.kgraph.qdrant_client, "create_payload_index") as create:
+            self.assertFalse(self.kgraph.index_metadata_field("source"))
+        create.assert_not_called()
+
+
+class TestGoalQueries(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kgraph.add_triples(
+            [("Sophia", "has_goal", f"goal {i}") for i in range(5)] + [("Sophia", "has_goal", "done")],
+            [{"goal_status": "pending", "priority": i % 5 + 1} for i in range(5)] + [{"goal_status": "completed"}]
+        )
+
+    def test_filtered_queries_page_up_to_limit(self):
+        goals = self.kgraph.query_goals_by_status("pending", limit=3)
+        self.assertEqual(len(goals), 3)
+        self.assertTrue(all(meta["goal_status"] == "pending" for _, meta in goals))
+        self.assertEqual(len(self.kgraph.query_active_goals()), 5)
+        self.assertCountEqual(self.kgraph.query_goals_by_priority(4, 5, return_metadata=False),
+                              [("Sophia", "has_goal", "goal 3"), ("Sophia", "has_goal", "goal 4")])
+
+    def test_goal_filters_are_built_once(self):
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "scroll", side_effect=client.scroll) as scroll:
+            for _ in range(2):
+                self.assertEqual(len(self.kgraph.query_high_priority_goals(4)), 2)
+                self.assertEqual(len(self.kgraph.query_active_goals()), 5)
+        filters = [c.kwargs["scroll_filter"] for c in scroll.call_args_list]
+        self.assertIs(filters[0], filters[2])
+        self.assertIs(filters[1], filters[3])
+
+    def test_soa_goal_batch(self):
+        batch = self.kgraph.query_goals_by_priority(4, 5, return_format="soa")
+        self.assertIsInstance(batch, vkg_module.GoalBatch)
+        self.assertEqual(batch.priorities.dtype, np.int8)
+        self.assertCountEqual(zip(batch.objects, batch.priorities.tolist(), batch.statuses),
+                              [("goal 3", 4, "pending"), ("goal 4", 5, "pending")])
+        self.assertEqual(len(self.kgraph.query_active_goals(return_format="soa")), 5)
+        with self.assertRaises(ValueError):
+            self.kgraph.query_active_goals(return_format="columns")
+
+    def test_update_goal_metadata_writes_matched_point(self):
+        with mock.patch.object(self.kgraph, "_triple_id", side_effect=self.kgraph._triple_id) as triple_id:
+            self.assertTrue(self.kgraph.update_goal_metadata("goal 2", {"goal_status": "completed"}))
+        triple_id.assert_not_called()
+        completed = self.kgraph.query_goals_by_status("completed", return_metadata=False)
+        self.assertCountEqual(completed, [("Sophia", "has_goal", "goal 2"), ("Sophia", "has_goal", "done")])
+        self.assertFalse(self.kgraph.update_goal_metadata("unrelated", {"goal_status": "completed"}))
+
+    def test_repeated_goal_updates_skip_search(self):
+        self.assertTrue(self.kgraph.update_goal_metadata("goal 1", {"goal_status": "in_progress"}))
+        with mock.patch.object(self.kgraph, "_best_goal_hit") as search:
+            self.assertTrue(self.kgraph.update_goal_metadata("goal 1", {"goal_status": "completed"}))
+        search.assert_not_called()
+        _, metadata = self.kgraph.query_goal_by_description("goal 1")
+        self.assertEqual(metadata["goal_status"], "completed")
+
+    def test_goal_found_behind_non_goal_matches(self):
+        self.kgraph.add_triples([(f"note {i}", "mentions", "goal 2") for i in range(12)])
+        triple, _ = self.kgraph.query_goal_by_description("goal 2")
+        self.assertEqual(triple, ("Sophia", "has_goal", "goal 2"))
+
+    def test_fuzzy_goal_match_is_not_cached(self):
+        base_encode = self.embedder.encode
+
+        def encode(sentences, **kwargs):
+            # "Learn Rust" lands close to, but not on, "Learn Rust basics"
+            rows = base_encode(sentences, **kwargs)
+            for i, sentence in enumerate(sentences):
+                if sentence == "Learn Rust":
+                    v = base_encode(["Learn Rust basics"])[0] + 0.3 * rows[i]
+                    rows[i] = v / np.linalg.norm(v)
+            return rows
+
+        self.embedder.encode = encode
+        self.kgraph.add_triples([("Sophia", "has_goal", "Learn Rust basics")], [{"goal_status": "pending"}])
+        self.assertTrue(self.kgraph.update_goal_metadata("Learn Rust", {"goal_status": "in_progress"}))
+        self.kgraph.add_triples([("Sophia", "has_goal", "Learn Rust")], [{"goal_status": "pending"}])
+        self.assertTrue(self.kgraph.update_goal_metadata("Learn Rust", {"goal_status": "completed"}))
+        completed = self.kgraph.query_goals_by_status("completed", return_metadata=False)
+        self.assertIn(("Sophia", "has_goal", "Learn Rust"), completed)
+        self.assertNotIn(("Sophia", "has_goal", "Learn Rust basics"), completed)
+
+    def test_update_goal_status_by_id(self):
+        point_id = self.kgraph._triple_id("Sophia", "has_goal", "goal 0")
+        self.assertTrue(self.kgraph.update_goal_status(point_id, "blocked"))
+        self.assertEqual(self.kgraph.query_goals_by_status("blocked", return_metadata=False),
+                         [("Sophia", "has_goal", "goal 0")])
+        self.assertFalse(self.kgraph.update_goal_status(self.kgraph._triple_id("a", "b", "c"), "blocked"))
+
+    def test_iter_goals_by_status_is_lazy(self):
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "scroll", side_effect=client.scroll) as scroll:
+            goals = self.kgraph.iter_goals_by_status("completed", return_metadata=False)
+            scroll.assert_not_called()
+            self.assertEqual(next(goals), ("Sophia", "has_goal", "done"))
+        self.assertEqual(scroll.call_args.kwargs["with_payload"].include, ["subject", "relationship", "object"])
+
+
+class TestSearchCache(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        # Exercise the Qdrant search path rather than the in-memory matrix
+        self.kgraph._subject_matrix_max_points = 0
+
+    def test_repeat_query_hits_cache_until_write(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird")])
+        self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9)
+        self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9)
+        self.assertEqual(self.kgraph.get_cache_stats()["search_cache_hits"], 1)
+
+        self.kgraph.add_triples([("cat", "has", "whiskers")])
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9)
+        self.assertIn(("cat", "has", "whiskers"), results)
+
+    def test_empty_check_cached_until_write(self):
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "get_collection", side_effect=client.get_collection) as spy:
+            self.assertEqual(self.kgraph.build_graph_from_noun("cat"), [])
+            self.assertEqual(self.kgraph.build_graph_from_noun("cat"), [])
+            self.assertEqual(spy.call_count, 1)
+            self.kgraph.add_triples([("cat", "hunts", "bird")])
+            self.assertEqual(self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9),
+                             [("cat", "hunts", "bird")])
+            self.assertEqual(spy.call_count, 2)
+
+    def test_cached_metadata_not_mutated(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird")], [{"source": "test"}])
+        first = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, return_metadata=True)
+        first[0][1]["confidence"] = -1
+        second = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, return_metadata=True)
+        self.assertGreater(second[0][1]["confidence"], 0)
+
+
+class TestTraversal(VectorKnowledgeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        # Exercise the Qdrant search path rather than the in-memory matrix
+        self.kgraph._subject_matrix_max_points = 0
+
+    def test_build_graph_from_noun_follows_objects(self):
+        self.kgraph.add_triples([
+            ("cat", "hunts", "bird"),
+            ("bird", "eats", "seeds"),
+            ("dog", "chases", "cat"),
+        ])
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=1)
+        self.assertEqual(set(results), {("cat", "hunts", "bird"), ("bird", "eats", "seeds")})
+
+    def test_each_level_is_one_batched_round_trip(self):
+        self.kgraph.add_triples([
+            ("cat", "hunts", "bird"),
+            ("cat", "chases", "mouse"),
+            ("bird", "eats", "seeds"),
+            ("mouse", "eats", "cheese"),
+        ])
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "query_batch_points", side_effect=client.query_batch_points) as spy:
+            results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=2,
+                                                        return_metadata=True)
+        # Known subjects are searched by point ID, leaf objects by vector
+        self.assertEqual(recommend_batch_sizes(spy), [1, 2])
+        self.assertEqual([len(c.kwargs["requests"]) for c in spy.call_args_list
+                          if not isinstance(c.kwargs["requests"][0].query, models.RecommendQuery)], [2])
+        confidences = {triple: meta["confidence"] for triple, meta in results}
+        self.assertLess(confidences[("bird", "eats", "seeds")], confidences[("cat", "hunts", "bird")])
+
+    def test_node_budget_stops_descent(self):
+        self.kgraph.add_triples([
+            ("cat", "hunts", "bird"),
+            ("cat", "chases", "mouse"),
+            ("bird", "eats", "seeds"),
+            ("mouse", "eats", "cheese"),
+        ])
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=2, max_nodes=2)
+        self.assertEqual(len(results), 3)
+        self.assertIn(("cat", "hunts", "bird"), results)
+        self.assertIn(("cat", "chases", "mouse"), results)
+
+    def test_triples_matched_from_several_nodes_are_returned_once(self):
+        triples = [("cat", "hunts", "bird"), ("bird", "eats", "seeds")]
+        self.kgraph.add_triples(triples, [{"source": "a"}, {"source": "b"}])
+        # A threshold of -1 matches every triple from every node
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=-1.0, depth=1,
+                                                    return_metadata=True)
+        self.assertCountEqual([t for t, _ in results], triples)
+        for triple, meta in results:
+            self.assertEqual(meta["source"], "a" if triple == triples[0] else "b")
+
+    def test_visualize_shares_one_traversal_across_roots(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("dog", "chases", "bird"), ("bird", "eats", "seeds")])
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "query_batch_points", side_effect=client.query_batch_points) as spy, \
+                mock.patch("matplotlib.pyplot.show"):
+            self.kgraph.visualize_graph_from_nouns(["cat", "dog", "cat"], similarity_threshold=0.9, depth=1)
+        self.assertEqual(recommend_batch_sizes(spy), [2, 1])
+
+    def test_several_roots_share_one_traversal(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("dog", "chases", "bird"), ("bird", "eats", "seeds")])
+        client = self.kgraph.qdrant_client
+        with mock.patch.object(client, "query_batch_points", side_effect=client.query_batch_points) as spy:
+            results = asyncio.run(self.kgraph.abuild_graph_from_nouns(["cat", "dog"], similarity_threshold=0.9,
+                                                                      depth=1, return_metadata=True))
+        self.assertEqual(recommend_batch_sizes(spy), [2, 1])
+        self.assertCountEqual([t for t, _ in results],
+                              [("cat", "hunts", "bird"), ("dog", "chases", "bird"), ("bird", "eats", "seeds")])
+
+    def test_layout_positions_every_node(self):
+        import networkx as nx
+
+        G = nx.DiGraph([("cat", "bird"), ("bird", "seeds")])
+        pos = VectorKnowledgeGraph._graph_layout(G)
+        self.assertEqual(set(pos), {"cat", "bird", "seeds"})
+        self.assertTrue(all(len(p) == 2 for p in pos.values()))
+
+    def test_layout_falls_back_when_sfdp_fails(self):
+        import networkx as nx
+
+        G = nx.DiGraph([("cat", "bird"), ("bird", "seeds")])
+        with mock.patch("networkx.drawing.nx_agraph.graphviz_layout",
+                        side_effect=ValueError("Program sfdp not found in path.")):
+            pos = VectorKnowledgeGraph._graph_layout(G)
+        self.assertEqual(set(pos), {"cat", "bird", "seeds"})
+
+    def test_visualize_returns_large_graph_without_drawing(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        self.kgraph._VISUALIZE_MAX_NODES = 2
+        with mock.patch("matplotlib.pyplot.show") as show:
+            G = self.kgraph.visualize_graph_from_nouns(["cat"], similarity_threshold=0.9, depth=1)
+        show.assert_not_called()
+        self.assertEqual(set(G.edges), {("cat", "bird"), ("bird", "seeds")})
+
+    def test_visualize_skips_labels_on_dense_graphs(self):
+        from matplotlib import pyplot as plt
+
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        self.kgraph._VISUALIZE_MAX_EDGE_LABELS = 1
+        with mock.patch("matplotlib.pyplot.show") as show, \
+                mock.patch("networkx.draw_networkx_edge_labels") as edge_labels, \
+                mock.patch("networkx.draw_networkx_labels") as node_labels:
+            self.kgraph.visualize_graph_from_nouns(["cat"], similarity_threshold=0.9, depth=1)
+        show.assert_called_once()
+        edge_labels.assert_not_called()
+        node_labels.assert_called_once()
+        plt.close("all")
+
+    def test_known_subjects_reuse_stored_vectors(self):
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        self.kgraph._emb_cache.clear()
+        self.embedder.encoded.clear()
+
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=1)
+        self.assertEqual(self.embedder.encoded, [])
+        self.assertEqual(set(results), {("cat", "hunts", "bird"), ("bird", "eats", "seeds")})
+
+    def test_subjects_found_by_payload_filter(self):
+        self.kgraph._local_storage = False
+        self.kgraph.add_triples([("cat", "hunts", "bird"), ("bird", "eats", "seeds")])
+        self.kgraph._subject_to_id.clear()
+        self.kgraph._emb_cache.clear()
+        self.embedder.encoded.clear()
+
+        results = self.kgraph.build_graph_from_noun("cat", similarity_threshold=0.9, depth=1)
+        self.assertEqual(self.embedder.encoded, [])
+        self.assertEqual(set(results), {("cat", "hunts", "bird"), ("bird", "eats", "seeds")})
+
+
+if __name__ == "__main__":
+    unittest.main()